@@ -210,6 +210,11 @@ def example_with_selenium():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
     # Example usage
     handler = AdvancedSearchHandler(
         config=RequestConfig(delay_between_requests=3.0)
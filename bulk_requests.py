@@ -5,18 +5,18 @@ Bulk request handler for reyestr.court.gov.ua
 Ensure you comply with the website's terms of service and applicable laws.
 """
 
+import re
+import threading
 import time
+import weakref
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from urllib.parse import urljoin
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -28,6 +28,93 @@ class RequestConfig:
     max_retries: int = 3
     timeout: int = 30
     user_agent: str = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+    pool_maxsize: int = 8  # Keep-alive connections held for base_url (>= threads sharing the session)
+    gateway_retries: int = 2  # Quick transport-level retries on 502/503/504
+    max_concurrent: int = 3  # Requests in flight at once per session
+
+
+# Instructions shown by a blocking CAPTCHA, as UTF-8 bytes. Bytes patterns
+# only fold ASCII case, so the sentence-initial letter is matched in both cases.
+# (The first phrase uses a Latin 'c', as the site does.)
+_CAPTCHA_BLOCKING_RE = re.compile(
+    '(?:в|В)(?:ведіть cуму цифр|ведіть в поле результат арифметичного виразу)'.encode('utf-8')
+)
+
+
+class _TokenBucket:
+    """
+    Single-token bucket: hands out one request slot per interval.
+    
+    Safe to call from several threads: each caller reserves the next slot
+    under the lock and sleeps outside it, so request starts stay spaced while
+    their round trips overlap, and time already spent since the last slot
+    counts towards the next one.
+    """
+    
+    def __init__(self):
+        self._next_allowed = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self, interval: float):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_allowed - now
+            self._next_allowed = max(now, self._next_allowed) + interval
+        if wait > 0:
+            logger.info(f"Rate limiting: sleeping for {wait:.2f} seconds")
+            time.sleep(wait)
+
+
+class _SessionState:
+    """Rate limit, concurrency cap and homepage cache shared by handlers on one session"""
+    
+    def __init__(self, max_concurrent: int):
+        self.bucket = _TokenBucket()
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.home_response: Optional[requests.Response] = None
+        self.home_fetched_at = 0.0
+        self.home_lock = threading.Lock()
+
+
+# Per-session state, dropped together with the session
+_session_states = weakref.WeakKeyDictionary()
+
+
+def create_session(config: Optional[RequestConfig] = None) -> requests.Session:
+    """
+    Create a keep-alive session with the browser-like headers
+    
+    Use this to share one connection pool between several BulkRequestHandler
+    instances (pass it as ``session=``) so each handler does not pay a new
+    TCP + TLS handshake for its first request.
+    """
+    config = config or RequestConfig()
+    session = requests.Session()
+    # Only base_url is mounted, so one pool suffices. Transient gateway errors
+    # are retried on the pooled connection before _make_request sees them;
+    # timeouts and connection errors are left to _make_request's own loop.
+    gateway_retry = Retry(
+        total=config.gateway_retries,
+        connect=0,
+        read=0,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=None,
+        backoff_factor=0.5,
+        raise_on_status=False
+    )
+    session.mount(
+        config.base_url,
+        HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_maxsize, max_retries=gateway_retry)
+    )
+    session.headers.update({
+        'User-Agent': config.user_agent,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    })
+    return session
 
 
 class BulkRequestHandler:
@@ -36,27 +123,26 @@ class BulkRequestHandler:
     and error handling.
     """
     
-    def __init__(self, config: Optional[RequestConfig] = None):
+    def __init__(
+        self,
+        config: Optional[RequestConfig] = None,
+        session: Optional[requests.Session] = None
+    ):
         self.config = config or RequestConfig()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': self.config.user_agent,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-        self.last_request_time = 0
+        # A session passed in is shared with other handlers and closed by its owner
+        self._owns_session = session is None
+        self.session = session or create_session(self.config)
+        # Handlers sharing a session also share its rate limit, concurrency cap
+        # and homepage cache
+        self._state = _session_states.get(self.session)
+        if self._state is None:
+            self._state = _session_states[self.session] = _SessionState(self.config.max_concurrent)
+        self._bucket = self._state.bucket
+        self._slots = self._state.slots
     
     def _rate_limit(self):
         """Enforce rate limiting between requests"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.config.delay_between_requests:
-            sleep_time = self.config.delay_between_requests - elapsed
-            logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-        self.last_request_time = time.time()
+        self._bucket.acquire(self.config.delay_between_requests)
     
     def _make_request(
         self,
@@ -74,12 +160,13 @@ class BulkRequestHandler:
                 self._rate_limit()
                 
                 logger.info(f"Making {method} request to {url} (attempt {attempt + 1})")
-                response = self.session.request(
-                    method=method,
-                    url=url,
-                    timeout=self.config.timeout,
-                    **kwargs
-                )
+                with self._slots:
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        timeout=self.config.timeout,
+                        **kwargs
+                    )
                 
                 # Check for rate limiting
                 if response.status_code == 429:
@@ -124,31 +211,50 @@ class BulkRequestHandler:
         if response.status_code != 200:
             return False
         
-        # Check for common CAPTCHA indicators
-        content_lower = response.text.lower()
-        captcha_indicators = [
-            'суму цифр',
-            'арифметичного виразу',
-            'малюнку',
-            'перевірити'
-        ]
-        
-        # More strict check: look for CAPTCHA-related form elements
-        # The page might mention CAPTCHA but not require it for viewing
-        has_captcha_form = any(indicator in content_lower for indicator in captcha_indicators)
-        
-        # Check if CAPTCHA is actually blocking (more specific patterns)
-        is_blocked = (
-            'введіть cуму цифр' in content_lower or
-            'введіть в поле результат арифметичного виразу' in content_lower
-        )
-        
-        return is_blocked  # Only return True if actually blocked
+        # Only the instructions shown when the CAPTCHA is actually blocking
+        # count; searched in the raw bytes, stopping at the first hit
+        return _CAPTCHA_BLOCKING_RE.search(response.content) is not None
     
     def get_page(self, endpoint: str = "/", params: Optional[Dict] = None) -> Optional[requests.Response]:
         """GET request to a specific endpoint"""
         return self._make_request('GET', endpoint, params=params)
     
+    def ensure_home(self, ttl: float = 60.0) -> Optional[requests.Response]:
+        """
+        GET the homepage unless this session already loaded it within ttl seconds
+        
+        Establishing the session (cookies) needs only one homepage load, so
+        handlers sharing a session (including ones on other threads) reuse
+        the cached response.
+        """
+        state = self._state
+        # Held across the fetch so concurrent callers wait for one load
+        with state.home_lock:
+            if state.home_response is None or time.monotonic() - state.home_fetched_at > ttl:
+                response = self.get_page("/")
+                if response is None:
+                    return None
+                state.home_response = response
+                state.home_fetched_at = time.monotonic()
+            return state.home_response
+    
+    def head_page(self, endpoint: str = "/") -> Optional[requests.Response]:
+        """
+        HEAD request to a specific endpoint
+        
+        Cheap reachability probe: returns status and headers without
+        downloading the body. Not retried; returns None on failure.
+        """
+        url = urljoin(self.config.base_url, endpoint)
+        try:
+            self._rate_limit()
+            logger.info(f"Making HEAD request to {url}")
+            with self._slots:
+                return self.session.head(url, allow_redirects=True, timeout=self.config.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"HEAD request failed: {e}")
+            return None
+    
     def post_search(
         self,
         search_params: Dict,
@@ -198,12 +304,19 @@ class BulkRequestHandler:
         return results
     
     def close(self):
-        """Close the session"""
-        self.session.close()
+        """Close the session (only if this handler created it)"""
+        if self._owns_session:
+            self.session.close()
 
 
 # Example usage
 if __name__ == "__main__":
+    # Configure logging only when run as a script; importers set up their own
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
     # Example search parameters (adjust based on actual form fields)
     example_searches = [
         {
@@ -4,11 +4,13 @@ Playwright-based bulk request handler for reyestr.court.gov.ua
 Uses headless browser to handle JavaScript-rendered content and form interactions.
 """
 
-import time
 import asyncio
-from typing import Dict, List, Optional
+import base64
+from typing import Callable, Dict, List, Optional
 from dataclasses import dataclass
 import logging
+import aiofiles
+import httpx
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext
 
 logging.basicConfig(
@@ -18,6 +20,68 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Any of the search form's submit controls, as one selector list so Playwright
+# resolves them in a single round-trip
+SUBMIT_BUTTON_SELECTOR = (
+    'input[type="submit"], button[type="submit"], '
+    'input[value*="Пошук"], button:has-text("Пошук")'
+)
+
+
+# Result-count banner or CAPTCHA modal, whichever a submitted search shows first
+RESULTS_READY_SELECTOR = 'span:has-text("знайдено документів"), #modalcaptcha'
+
+
+# Collects document links from a results page, stopping after maxLinks
+# (null/0 = all). Only the URL and basic info are collected.
+_COLLECT_DOCUMENT_LINKS_JS = """
+    (maxLinks) => {
+        const links = [];
+        const docLinks = document.querySelectorAll('a.doc_text2[href^="/Review/"]');
+        
+        for (const link of docLinks) {
+            if (maxLinks && links.length >= maxLinks) {
+                break;
+            }
+            
+            const href = link.getAttribute('href');
+            const id = href.replace('/Review/', '');
+            const regNumber = link.textContent.trim();
+            
+            links.push({
+                id: id,
+                url: href,
+                reg_number: regNumber || id
+            });
+        }
+        
+        return links;
+    }
+"""
+
+# Result count, CAPTCHA modal visibility and document links in one call
+_SEARCH_SUMMARY_JS = """
+    (maxLinks) => {
+        const collectLinks = """ + _COLLECT_DOCUMENT_LINKS_JS + """;
+        
+        const banner = Array.from(document.querySelectorAll('span'))
+            .find(span => span.textContent.includes('знайдено документів'));
+        const match = banner && banner.textContent.match(/знайдено документів:\\s*(\\d+)/);
+        
+        const captcha = document.querySelector('#modalcaptcha');
+        const captchaVisible = !!captcha && captcha.getClientRects().length > 0
+            && getComputedStyle(captcha).visibility !== 'hidden';
+        
+        return {
+            has_results: !!banner,
+            document_count: match ? parseInt(match[1], 10) : null,
+            has_captcha: captchaVisible,
+            links: collectLinks(maxLinks)
+        };
+    }
+"""
+
+
 @dataclass
 class PlaywrightConfig:
     """Configuration for Playwright bulk requests"""
@@ -28,6 +92,59 @@ class PlaywrightConfig:
     viewport_width: int = 1920
     viewport_height: int = 1080
     user_agent: str = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    screenshot_full_page: bool = True  # False = viewport only (much cheaper on long pages)
+    screenshot_quality: int = 80  # JPEG quality for .jpg screenshots
+
+
+async def _write_bytes(path: str, data: bytes):
+    """Write binary data to a file without blocking the event loop"""
+    async with aiofiles.open(path, 'wb') as f:
+        await f.write(data)
+
+
+class _TokenBucket:
+    """
+    Single-token bucket: hands out one request slot per interval.
+    
+    A slot is reserved before sleeping, so concurrent callers queue up at
+    distinct times instead of all waking together, and time spent working
+    since the last slot counts towards the next one.
+    """
+    
+    def __init__(self):
+        self._next_allowed = 0.0
+    
+    async def acquire(self, interval: float):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        wait = self._next_allowed - now
+        self._next_allowed = max(now, self._next_allowed) + interval
+        if wait > 0:
+            logger.info(f"Rate limiting: sleeping for {wait:.2f} seconds")
+            await asyncio.sleep(wait)
+
+
+async def launch_browser(config: Optional[PlaywrightConfig] = None):
+    """
+    Start Playwright and launch Chromium
+    
+    Use this to share one browser between several PlaywrightBulkHandler
+    instances (pass it as ``browser=``) instead of launching one per handler.
+    
+    Returns:
+        Tuple of (playwright, browser); stop both when done
+    """
+    config = config or PlaywrightConfig()
+    playwright = await async_playwright().start()
+    try:
+        browser = await playwright.chromium.launch(
+            headless=config.headless,
+            args=['--no-sandbox', '--disable-setuid-sandbox'] if config.headless else []
+        )
+    except Exception:
+        await playwright.stop()
+        raise
+    return playwright, browser
 
 
 class PlaywrightBulkHandler:
@@ -36,56 +153,83 @@ class PlaywrightBulkHandler:
     Better for JavaScript-heavy sites and form interactions.
     """
     
-    def __init__(self, config: Optional[PlaywrightConfig] = None):
+    def __init__(
+        self,
+        config: Optional[PlaywrightConfig] = None,
+        browser: Optional[Browser] = None,
+        rate_limiter: Optional[_TokenBucket] = None
+    ):
+        """
+        Args:
+            config: Playwright configuration
+            browser: Optional already-launched browser to share. The handler then
+                     only opens its own context and page on it, and close() leaves
+                     the browser running for its owner.
+            rate_limiter: Optional rate limiter to share, taken from another
+                          handler's ``rate_limiter``. Requests of all handlers
+                          sharing it are then spaced by delay_between_requests
+                          together instead of per handler.
+        """
         self.config = config or PlaywrightConfig()
         self.playwright = None
-        self.browser: Optional[Browser] = None
+        self.browser: Optional[Browser] = browser
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
-        self.last_request_time = 0
+        self.rate_limiter = rate_limiter or _TokenBucket()
+        self._owns_browser = browser is None
+        # Keep-alive HTTP client for file downloads, created on first use
+        self._http: Optional[httpx.AsyncClient] = None
     
     async def _init_browser(self):
         """Initialize Playwright browser and context"""
         if self.browser is None:
             try:
-                self.playwright = await async_playwright().start()
-                self.browser = await self.playwright.chromium.launch(
-                    headless=self.config.headless,
-                    args=['--no-sandbox', '--disable-setuid-sandbox'] if self.config.headless else []
-                )
-                self.context = await self.browser.new_context(
-                    viewport={'width': self.config.viewport_width, 'height': self.config.viewport_height},
-                    user_agent=self.config.user_agent,
-                    locale='uk-UA',
-                    timezone_id='Europe/Kyiv'
-                )
-                self.page = await self.context.new_page()
-                logger.info("Browser initialized")
+                self.playwright, self.browser = await launch_browser(self.config)
             except Exception as e:
                 logger.error(f"Failed to initialize browser: {e}")
-                # Clean up on failure
-                if self.browser:
-                    try:
-                        await self.browser.close()
-                    except:
-                        pass
-                if self.playwright:
-                    try:
-                        await self.playwright.stop()
-                    except:
-                        pass
                 self.browser = None
                 self.playwright = None
                 raise
+        
+        if self.page is None:
+            self.context = await self.browser.new_context(
+                viewport={'width': self.config.viewport_width, 'height': self.config.viewport_height},
+                user_agent=self.config.user_agent,
+                locale='uk-UA',
+                timezone_id='Europe/Kyiv'
+            )
+            self.page = await self.context.new_page()
+            logger.info("Browser initialized")
+    
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        Get the keep-alive HTTP client used for file downloads
+        
+        Cookies are copied from the browser context on every call so
+        downloads run in the same session as the page that linked them.
+        """
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=self.config.timeout / 1000,
+                headers={'User-Agent': self.config.user_agent},
+                follow_redirects=True
+            )
+        
+        if self.context:
+            for cookie in await self.context.cookies():
+                self._http.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie['domain'],
+                    path=cookie['path']
+                )
+        
+        return self._http
     
     async def _rate_limit(self):
         """Enforce rate limiting between requests"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.config.delay_between_requests:
-            sleep_time = self.config.delay_between_requests - elapsed
-            logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            await asyncio.sleep(sleep_time)
-        self.last_request_time = time.time()
+        await self.rate_limiter.acquire(self.config.delay_between_requests)
     
     async def navigate(self, endpoint: str = "/", wait_until: str = "networkidle") -> Optional[Page]:
         """
@@ -116,7 +260,8 @@ class PlaywrightBulkHandler:
         self,
         search_params: Dict,
         wait_for_results: bool = True,
-        wait_selector: Optional[str] = None
+        wait_selector: Optional[str] = None,
+        before_submit: Optional[Callable[[], bool]] = None
     ) -> Optional[Page]:
         """
         Perform a search by filling out the form
@@ -125,6 +270,9 @@ class PlaywrightBulkHandler:
             search_params: Dictionary of search parameters
             wait_for_results: Whether to wait for results to load
             wait_selector: CSS selector to wait for (e.g., results table)
+            before_submit: Called right before the form is submitted, after
+                          all rate-limit waits; return False to abort the
+                          search (returns None)
         """
         await self._init_browser()
         
@@ -211,24 +359,22 @@ class PlaywrightBulkHandler:
             if 'DateTo' in search_params:
                 await page.fill('input[name="DateTo"]', search_params['DateTo'])
             
+            if before_submit and not before_submit():
+                logger.info("Search aborted before submitting the form")
+                return None
+            
             # Submit the form - look for submit button
             logger.info("Submitting search form...")
             # Try to find submit button - it might be an input or button
-            submit_selectors = [
-                'input[type="submit"]',
-                'button[type="submit"]',
-                'input[value*="Пошук"]',
-                'button:has-text("Пошук")'
-            ]
-            
+            # (all candidates resolved in one round-trip)
             submitted = False
-            for selector in submit_selectors:
-                try:
-                    await page.click(selector, timeout=2000)
+            submit_button = page.locator(SUBMIT_BUTTON_SELECTOR).first
+            try:
+                if await submit_button.count() > 0:
+                    await submit_button.click(timeout=2000)
                     submitted = True
-                    break
-                except:
-                    continue
+            except:
+                pass
             
             if not submitted:
                 # Fallback: use form submission via JavaScript
@@ -241,8 +387,16 @@ class PlaywrightBulkHandler:
                     logger.info(f"Waiting for selector: {wait_selector}")
                     await page.wait_for_selector(wait_selector, timeout=self.config.timeout)
                 else:
-                    # Wait for page to load
-                    await page.wait_for_load_state('networkidle', timeout=self.config.timeout)
+                    # Return as soon as the result count or a CAPTCHA shows up;
+                    # fall back to network idle if neither appears
+                    try:
+                        await page.wait_for_selector(
+                            RESULTS_READY_SELECTOR,
+                            state='visible',
+                            timeout=self.config.timeout
+                        )
+                    except Exception:
+                        await page.wait_for_load_state('networkidle', timeout=self.config.timeout)
             
             logger.info(f"✓ Search completed: {page.url}")
             return page
@@ -343,11 +497,22 @@ class PlaywrightBulkHandler:
         
         return results
     
-    async def take_screenshot(self, filename: str = "screenshot.png", full_page: bool = True):
-        """Take a screenshot of the current page"""
+    async def take_screenshot(self, filename: str = "screenshot.png", full_page: Optional[bool] = None):
+        """
+        Take a screenshot of the current page
+        
+        The image format follows the file extension; .jpg/.jpeg files are
+        written with config.screenshot_quality. full_page defaults to
+        config.screenshot_full_page.
+        """
         if self.page:
             try:
-                await self.page.screenshot(path=filename, full_page=full_page)
+                if full_page is None:
+                    full_page = self.config.screenshot_full_page
+                options = {}
+                if filename.lower().endswith(('.jpg', '.jpeg')):
+                    options['quality'] = self.config.screenshot_quality
+                await self.page.screenshot(path=filename, full_page=full_page, **options)
                 logger.info(f"Screenshot saved to {filename}")
                 return filename
             except Exception as e:
@@ -355,6 +520,27 @@ class PlaywrightBulkHandler:
                 return None
         return None
     
+    async def extract_search_summary(self, max_links: Optional[int] = None) -> Optional[Dict]:
+        """
+        Read everything a batch needs from a results page in one round-trip
+        
+        Args:
+            max_links: Maximum number of document links to collect (None for all)
+        
+        Returns:
+            Dictionary with has_results, document_count (or None), has_captcha
+            (visible CAPTCHA modal only; not conclusive when False) and links
+            (same shape as extract_document_links), or None on error
+        """
+        if not self.page:
+            return None
+        
+        try:
+            return await self.page.evaluate(_SEARCH_SUMMARY_JS, max_links)
+        except Exception as e:
+            logger.error(f"Error extracting search summary: {e}")
+            return None
+    
     async def extract_document_links(self, max_links: Optional[int] = None) -> List[Dict]:
         """
         Extract document links from search results page
@@ -370,32 +556,9 @@ class PlaywrightBulkHandler:
             return []
         
         try:
-            # Extract links using JavaScript - only collect URLs
-            links_data = await self.page.evaluate("""
-                () => {
-                    const links = [];
-                    const docLinks = document.querySelectorAll('a.doc_text2[href^="/Review/"]');
-                    
-                    docLinks.forEach(link => {
-                        const href = link.getAttribute('href');
-                        const id = href.replace('/Review/', '');
-                        const regNumber = link.textContent.trim();
-                        
-                        // Only collect URL and basic info
-                        const data = {
-                            id: id,
-                            url: href,
-                            reg_number: regNumber || id
-                        };
-                        links.push(data);
-                    });
-                    
-                    return links;
-                }
-            """)
-            
-            if max_links:
-                links_data = links_data[:max_links]
+            # Extract links using JavaScript - only collect URLs, and stop
+            # in the page once max_links have been collected
+            links_data = await self.page.evaluate(_COLLECT_DOCUMENT_LINKS_JS, max_links)
             
             logger.info(f"Extracted {len(links_data)} document links")
             return links_data
@@ -608,23 +771,48 @@ class PlaywrightBulkHandler:
                     num_pages = max(1, int((total_height + scroll_height - 1) / scroll_height))
                     logger.info(f"Will capture {num_pages} page(s) (scroll height: {scroll_height}px)")
                     
-                    # Scroll back to top
+                    # Scroll back to top and stretch the iframe to the full document
+                    # height, so every page can be addressed by a clip rectangle
+                    # instead of scrolling the frame between screenshots
                     await frame.evaluate("window.scrollTo(0, 0)")
+                    await iframe_locator.evaluate("(el, height) => { el.style.height = height + 'px'; }", total_height)
                     await asyncio.sleep(1)
                     
-                    # Screenshot each page
+                    box = await iframe_locator.bounding_box()
+                    scroll_y = await self.page.evaluate("window.scrollY")
+                    clips = []
                     for page_num in range(num_pages):
                         scroll_pos = page_num * scroll_height
-                        
-                        # Scroll to position
-                        await frame.evaluate(f"window.scrollTo({{ top: {scroll_pos}, behavior: 'instant' }})")
-                        await asyncio.sleep(1)  # Wait for scroll to complete and content to render
-                        
-                        # Take screenshot
-                        screenshot_path = f"{output_dir}/{document_id}_page_{page_num + 1:03d}.png"
-                        await iframe_locator.screenshot(path=screenshot_path)
-                        screenshot_paths.append(screenshot_path)
-                        logger.info(f"  Page {page_num + 1}/{num_pages} saved (scroll position: {scroll_pos}px)")
+                        clips.append({
+                            'x': box['x'],
+                            'y': box['y'] + scroll_y + scroll_pos,
+                            'width': box['width'],
+                            'height': min(effective_page_height, total_height - scroll_pos),
+                            'scale': 1
+                        })
+                    
+                    # Issue all page screenshots at once over one CDP session
+                    cdp = await self.context.new_cdp_session(self.page)
+                    try:
+                        captures = await asyncio.gather(*[
+                            cdp.send('Page.captureScreenshot', {
+                                'format': 'png',
+                                'clip': clip,
+                                'captureBeyondViewport': True
+                            })
+                            for clip in clips
+                        ])
+                    finally:
+                        await cdp.detach()
+                    
+                    screenshot_paths = [
+                        f"{output_dir}/{document_id}_page_{page_num + 1:03d}.png"
+                        for page_num in range(num_pages)
+                    ]
+                    await asyncio.gather(*[
+                        _write_bytes(screenshot_path, base64.b64decode(capture['data']))
+                        for screenshot_path, capture in zip(screenshot_paths, captures)
+                    ])
                     
                     logger.info(f"✓ Captured {len(screenshot_paths)} page(s) total")
                     return screenshot_paths
@@ -868,22 +1056,23 @@ class PlaywrightBulkHandler:
                 logger.info(f"Downloading from: {download_url}")
                 await self._rate_limit()
                 
-                # Use Playwright's download functionality
-                async with self.page.expect_download() as download_info:
-                    await self.page.goto(download_url, wait_until='networkidle')
-                
-                download = await download_info.value
+                # Fetch the file over the shared keep-alive client instead of
+                # a browser navigation
+                http = await self._get_http_client()
+                response = await http.get(download_url)
+                response.raise_for_status()
                 
                 # Save the file
-                await download.save_as(output_path)
+                async with aiofiles.open(output_path, 'wb') as f:
+                    await f.write(response.content)
                 logger.info(f"✓ Document saved to: {output_path}")
                 return output_path
             else:
                 # Fallback: Save the page HTML as document
                 logger.warning("No download link found, saving page HTML instead")
                 content = await self.page.content()
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                async with aiofiles.open(output_path, 'w', encoding='utf-8') as f:
+                    await f.write(content)
                 logger.info(f"✓ Page HTML saved to: {output_path}")
                 return output_path
                 
@@ -892,15 +1081,22 @@ class PlaywrightBulkHandler:
             return None
     
     async def close(self):
-        """Close browser and cleanup"""
+        """Close browser and cleanup (a shared browser is left to its owner)"""
+        if self._http:
+            await self._http.aclose()
+            self._http = None
         if self.page:
             await self.page.close()
+            self.page = None
         if self.context:
             await self.context.close()
-        if self.browser:
+            self.context = None
+        if self.browser and self._owns_browser:
             await self.browser.close()
+            self.browser = None
         if self.playwright:
             await self.playwright.stop()
+            self.playwright = None
         logger.info("Browser closed")
 
 
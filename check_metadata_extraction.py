@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Check that metadata extraction gives the same results as a reference revision
+
+Runs extract_metadata_from_html from the working tree and from
+update_metadata_from_html.py at a git revision (e.g. the commit before a
+change to the extractor) on sample HTML pages, and reports every field that
+differs.
+
+Usage:
+    python check_metadata_extraction.py --rev REV [page.html ...]
+"""
+
+import argparse
+import importlib.util
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+import update_metadata_from_html
+
+console = Console()
+
+REPO_DIR = Path(__file__).resolve().parent
+
+
+def load_reference_module(rev: str):
+    """Import update_metadata_from_html.py as it was at the given revision"""
+    source = subprocess.run(
+        ['git', 'show', f'{rev}:update_metadata_from_html.py'],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    ).stdout
+
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False, encoding='utf-8') as f:
+        f.write(source)
+
+    try:
+        spec = importlib.util.spec_from_file_location('reference_update_metadata', f.name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        Path(f.name).unlink()
+    return module
+
+
+def main() -> int:
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rev', required=True, help='Reference git revision, e.g. the commit before the change')
+    parser.add_argument('pages', nargs='*', type=Path, help='HTML pages (default: *.html in the repo root)')
+    args = parser.parse_args()
+
+    rev = args.rev
+    pages = args.pages or sorted(REPO_DIR.glob('*.html'))
+
+    reference = load_reference_module(rev)
+
+    diff_table = Table(title=f"Differences from {rev[:12]}", box=box.ROUNDED, show_header=True, header_style="bold cyan")
+    diff_table.add_column("Page", style="cyan")
+    diff_table.add_column("Field", style="yellow")
+    diff_table.add_column("Reference", style="green")
+    diff_table.add_column("Working tree", style="red")
+
+    differences = 0
+    for page in pages:
+        expected = reference.extract_metadata_from_html(page)
+        actual = update_metadata_from_html.extract_metadata_from_html(page)
+        for field in expected:
+            if expected[field] != actual.get(field):
+                differences += 1
+                diff_table.add_row(page.name, field, repr(expected[field]), repr(actual.get(field)))
+
+    if differences:
+        console.print(diff_table)
+        console.print(f"[bold red]✗ {differences} field(s) differ across {len(pages)} page(s)[/bold red]")
+        return 1
+
+    console.print(f"[bold green]✓ {len(pages)} page(s) extract the same metadata as {rev[:12]}[/bold green]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
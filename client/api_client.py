@@ -2,12 +2,17 @@
 API client for communicating with download server
 """
 import requests
+from requests.adapters import HTTPAdapter
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connections held per client; covers the downloader loop plus the
+# registration and notification background threads
+HTTP_POOL_MAXSIZE = 10
+
 
 class DownloadServerClient:
     """Client for communicating with download server API"""
@@ -35,6 +40,12 @@ class DownloadServerClient:
         self.client_id: Optional[str] = None
         self.api_version = "v1"
         
+        # One persistent session so every call reuses a keep-alive connection
+        # instead of paying a TCP (and TLS) handshake per request
+        self._session = requests.Session()
+        self._session.mount(self.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE))
+        self._session.headers.update(self._get_headers())
+        
         # Register client if API key is provided
         if api_key:
             self._register_client()
@@ -46,17 +57,26 @@ class DownloadServerClient:
             headers["X-API-Key"] = self.api_key
         return headers
     
+    def close(self):
+        """Close pooled HTTP connections"""
+        self._session.close()
+    
+    def __enter__(self) -> "DownloadServerClient":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def _register_client(self) -> bool:
         """Register client with server"""
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/{self.api_version}/clients/register",
                 json={
                     "client_name": self.client_name,
                     "client_host": self.client_host,
                     "api_key": self.api_key
                 },
-                headers=self._get_headers(),
                 timeout=10
             )
             response.raise_for_status()
@@ -81,10 +101,9 @@ class DownloadServerClient:
             - status: Task status
         """
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/{self.api_version}/tasks/request",
                 json={},
-                headers=self._get_headers(),
                 timeout=30
             )
             
@@ -123,7 +142,7 @@ class DownloadServerClient:
             True if successful, False otherwise
         """
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/{self.api_version}/tasks/complete",
                 json={
                     "task_id": task_id,
@@ -133,7 +152,6 @@ class DownloadServerClient:
                     "result_summary": result_summary,
                     "error_message": error_message
                 },
-                headers=self._get_headers(),
                 timeout=30
             )
             response.raise_for_status()
@@ -147,10 +165,9 @@ class DownloadServerClient:
     def send_heartbeat(self) -> bool:
         """Send heartbeat to server"""
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/{self.api_version}/clients/heartbeat",
                 json={},
-                headers=self._get_headers(),
                 timeout=10
             )
             response.raise_for_status()
@@ -162,9 +179,8 @@ class DownloadServerClient:
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get status of a specific task"""
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.base_url}/api/{self.api_version}/tasks/{task_id}",
-                headers=self._get_headers(),
                 timeout=10
             )
             response.raise_for_status()
@@ -176,7 +192,7 @@ class DownloadServerClient:
     def health_check(self) -> bool:
         """Check if server is healthy"""
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.base_url}/health",
                 timeout=5
             )
@@ -202,14 +218,13 @@ class DownloadServerClient:
             Response dict with system_id and classification, or None on error
         """
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/{self.api_version}/documents/register",
                 json={
                     "task_id": task_id,
                     "search_params": search_params,
                     "metadata": metadata
                 },
-                headers=self._get_headers(),
                 timeout=30
             )
             response.raise_for_status()
@@ -227,6 +242,45 @@ class DownloadServerClient:
                     logger.error(f"Response: {e.response.text}")
             return None
     
+    def register_documents_bulk(
+        self,
+        documents: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Register a batch of documents on the server in one request
+        
+        Args:
+            documents: List of dicts with 'metadata' and optional
+                'task_id' / 'search_params' (same shape as register_document)
+        
+        Returns:
+            Response dict with registered/failed counts and per-document
+            results, or None on error
+        """
+        try:
+            response = self._session.post(
+                f"{self.base_url}/api/{self.api_version}/documents/register-bulk",
+                json={"documents": documents},
+                timeout=60
+            )
+            response.raise_for_status()
+            result = response.json()
+            logger.info(
+                f"Documents registered: {result.get('registered', 0)} ok, "
+                f"{result.get('failed', 0)} failed"
+            )
+            return result
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error registering {len(documents)} documents: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_detail = e.response.json()
+                    logger.error(f"Error detail: {error_detail}")
+                except:
+                    logger.error(f"Response: {e.response.text}")
+            return None
+    
     def get_document_by_system_id(self, system_id: str) -> Optional[Dict[str, Any]]:
         """
         Get document by system_id
@@ -238,9 +292,8 @@ class DownloadServerClient:
             Document dict or None if not found
         """
         try:
-            response = requests.get(
+            response = self._session.get(
                 f"{self.base_url}/api/{self.api_version}/documents/{system_id}",
-                headers=self._get_headers(),
                 timeout=10
             )
             response.raise_for_status()
@@ -265,9 +318,8 @@ class DownloadServerClient:
             else:
                 url = f"{self.base_url}/api/{self.api_version}/clients/me/statistics"
             
-            response = requests.get(
+            response = self._session.get(
                 url,
-                headers=self._get_headers(),
                 timeout=10
             )
             response.raise_for_status()
@@ -294,14 +346,13 @@ class DownloadServerClient:
             Response dict with statistics, or None on error
         """
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.base_url}/api/{self.api_version}/tasks/document-download-start",
                 json={
                     "task_id": task_id,
                     "document_id": document_id,
                     "reg_number": reg_number
                 },
-                headers=self._get_headers(),
                 timeout=10
             )
             response.raise_for_status()
@@ -5,7 +5,7 @@ import requests
 import json
 import sys
 import argparse
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
 
 def create_task(
@@ -45,6 +45,36 @@ def create_task(
         return False
 
 
+def create_tasks_bulk(
+    api_url: str,
+    tasks: List[Dict[str, Any]],
+    api_key: Optional[str] = None
+) -> int:
+    """Create many download tasks in a single request, returns number created"""
+    url = f"{api_url.rstrip('/')}/api/v1/tasks/create-bulk"
+    
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["X-API-Key"] = api_key
+    
+    try:
+        response = requests.post(url, json={"tasks": tasks}, headers=headers, timeout=60)
+        response.raise_for_status()
+        result = response.json()
+        for task_id in result['task_ids']:
+            print(f"✓ Task created: {task_id}")
+        return len(result['task_ids'])
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Error creating tasks: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            try:
+                error_detail = e.response.json()
+                print(f"  Detail: {error_detail}")
+            except:
+                print(f"  Response: {e.response.text}")
+        return 0
+
+
 def main():
     parser = argparse.ArgumentParser(description="Create download tasks")
     parser.add_argument(
@@ -98,17 +128,20 @@ def main():
     }
     
     if args.pages:
-        # Create multiple tasks
-        success_count = 0
-        for page in range(args.start_page, args.start_page + args.pages):
-            if create_task(
-                api_url=args.api_url,
-                search_params=search_params,
-                start_page=page,
-                max_documents=args.max_documents,
-                api_key=args.api_key
-            ):
-                success_count += 1
+        # Create multiple tasks in one request
+        tasks = [
+            {
+                "search_params": search_params,
+                "start_page": page,
+                "max_documents": args.max_documents
+            }
+            for page in range(args.start_page, args.start_page + args.pages)
+        ]
+        success_count = create_tasks_bulk(
+            api_url=args.api_url,
+            tasks=tasks,
+            api_key=args.api_key
+        )
         
         print(f"\n✓ Created {success_count}/{args.pages} tasks")
     else:
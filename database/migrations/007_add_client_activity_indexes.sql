@@ -0,0 +1,25 @@
+-- Migration: Indexes for client activity queries
+-- Supports the download_tasks filters used by ClientActivityTracker.get_client_activity:
+--   current task   (client_id + status IN ('in_progress','assigned') ORDER BY started_at DESC LIMIT 1)
+--   session stats  (client_id + started_at >= ...)
+--   recent errors  (client_id + error_message IS NOT NULL ORDER BY completed_at DESC LIMIT 10)
+--
+-- CONCURRENTLY avoids blocking writers; it cannot run inside a transaction,
+-- so run this file with plain psql -f (autocommit).
+--
+-- Verify with:
+--   EXPLAIN (ANALYZE, BUFFERS)
+--   SELECT id FROM download_tasks
+--   WHERE client_id = '<uuid>' AND status IN ('in_progress', 'assigned')
+--   ORDER BY started_at DESC LIMIT 1;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dt_client_status_started
+    ON download_tasks (client_id, started_at DESC)
+    WHERE status IN ('in_progress', 'assigned');
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dt_client_started
+    ON download_tasks (client_id, started_at DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dt_client_err_completed
+    ON download_tasks (client_id, completed_at DESC)
+    WHERE error_message IS NOT NULL;
@@ -0,0 +1,24 @@
+-- Migration: Store JSON payloads as JSONB
+-- webauthn_credentials.public_key and download_tasks.search_params are
+-- written as JSON documents; JSONB lets Postgres filter and index them
+-- without re-parsing text on every read.
+
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'webauthn_credentials' AND column_name = 'public_key') <> 'jsonb' THEN
+        ALTER TABLE webauthn_credentials
+            ALTER COLUMN public_key TYPE JSONB USING public_key::jsonb;
+    END IF;
+
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'download_tasks' AND column_name = 'search_params') <> 'jsonb' THEN
+        ALTER TABLE download_tasks
+            ALTER COLUMN search_params TYPE JSONB USING search_params::jsonb;
+    END IF;
+END $$;
+
+-- Task indexes are grouped and filtered by these two keys (->> equality),
+-- which an expression B-tree serves better than a GIN index
+CREATE INDEX IF NOT EXISTS idx_dt_search_params_region_instance
+    ON download_tasks ((search_params->>'CourtRegion'), (search_params->>'INSType'));
@@ -0,0 +1,11 @@
+-- Migration: Index for the client session window fallback
+-- ClientActivityTracker.get_client_activity counts tasks finished in the last
+-- 24 hours (client_id + status IN ('completed','failed') + completed_at >= ...)
+-- when the Redis session window is missing, and uses the rows to reseed it.
+--
+-- CONCURRENTLY avoids blocking writers; it cannot run inside a transaction,
+-- so run this file with plain psql -f (autocommit).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dt_client_finished_completed
+    ON download_tasks (client_id, completed_at DESC)
+    WHERE status IN ('completed', 'failed');
@@ -518,9 +518,8 @@ async def process_single_document(
                         # Merge all metadata sources
                         full_metadata = {**doc_link, **extracted_metadata}
                         full_metadata['document_id'] = doc_id
-                        server_result = register_document_on_server(full_metadata)
-                        if server_result:
-                            logger.info(f"Document registered on server: {server_result.get('system_id')}")
+                        if register_document_on_server(full_metadata):
+                            logger.debug(f"Document {doc_id} queued for server registration")
                     except ImportError:
                         # Module not available, skip server registration
                         pass
@@ -146,6 +146,14 @@ async def process_task_from_server(
             'error_message': str(e)
         }
     finally:
+        # Flush buffered document registrations before the task is reported
+        try:
+            from server_document_registry import set_server_context, flush_document_registrations
+            set_server_context(None)
+            await asyncio.to_thread(flush_document_registrations)
+        except ImportError:
+            pass
+        
         # Clean up temp config
         if temp_config_path.exists():
             temp_config_path.unlink()
@@ -262,6 +270,11 @@ async def client_loop(
         console.print(f"\n[bold red]✗ Client error: {e}[/bold red]")
         logger.error(f"Client error: {e}", exc_info=True)
         raise
+    finally:
+        # Push out buffered registrations before dropping pooled connections
+        from server_document_registry import flush_document_registrations
+        await asyncio.to_thread(flush_document_registrations)
+        api_client.close()
 
 
 def main():
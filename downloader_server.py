@@ -10,7 +10,6 @@ from pathlib import Path
 # Add server module to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from server.main import app
 from server.config import config
 
 # Configure logging
@@ -28,15 +27,20 @@ def main():
     logger.info("=" * 60)
     logger.info(f"API Host: {config.api_host}")
     logger.info(f"API Port: {config.api_port}")
+    logger.info(f"Workers: {config.api_workers}")
     logger.info(f"Database: {config.db_host}:{config.db_port}/{config.db_name}")
     logger.info(f"Authentication: {'Enabled' if config.enable_auth else 'Disabled'}")
     logger.info("=" * 60)
     
     try:
         uvicorn.run(
-            app,
+            "server.main:app",
             host=config.api_host,
             port=config.api_port,
+            workers=config.api_workers,
+            # uvloop when installed (not on Windows), asyncio otherwise
+            loop="auto",
+            http="httptools",
             log_level="info",
             access_log=True
         )
@@ -38,6 +38,9 @@ MIGRATIONS=(
     "004_add_client_id_to_documents.sql"
     "005_add_document_download_progress.sql"
     "006_add_users_and_webauthn.sql"
+    "007_add_client_activity_indexes.sql"
+    "008_jsonb_columns.sql"
+    "009_add_session_window_index.sql"
 )
 
 MIGRATIONS_DIR="database/migrations"
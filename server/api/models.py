@@ -2,7 +2,7 @@
 Pydantic models for API requests and responses
 """
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
@@ -49,6 +49,17 @@ class TaskCreateResponse(BaseModel):
     message: str
 
 
+class TaskBulkCreateRequest(BaseModel):
+    """Request to create many tasks at once"""
+    tasks: List[TaskCreateRequest] = Field(..., description="Tasks to create")
+
+
+class TaskBulkCreateResponse(BaseModel):
+    """Response after creating many tasks"""
+    task_ids: List[str]
+    message: str
+
+
 class TaskStatusResponse(BaseModel):
     """Task status information"""
     task_id: str
@@ -145,6 +156,20 @@ class DocumentRegisterResponse(BaseModel):
     message: str
 
 
+class DocumentBulkRegisterRequest(BaseModel):
+    """Request to register a batch of documents"""
+    documents: List[DocumentRegisterRequest] = Field(..., description="Documents to register")
+
+
+class DocumentBulkRegisterResponse(BaseModel):
+    """Response after registering a batch of documents"""
+    registered: int
+    failed: int
+    results: List[Optional[DocumentRegisterResponse]] = Field(
+        ..., description="Per-document results in request order (null if registration failed)"
+    )
+
+
 class DocumentDownloadStartRequest(BaseModel):
     """Request to notify server about document download start"""
     task_id: str = Field(..., description="Task ID")
@@ -7,28 +7,34 @@ import logging
 from server.api.models import (
     TaskRequest, TaskResponse, TaskCompleteRequest, TaskCompleteResponse,
     TaskCreateRequest, TaskCreateResponse, TaskStatusResponse,
+    TaskBulkCreateRequest, TaskBulkCreateResponse,
     ClientRegisterRequest, ClientRegisterResponse,
     ClientHeartbeatRequest, ClientHeartbeatResponse,
     TasksSummaryResponse, ClientsSummaryResponse, ErrorResponse,
     DocumentRegisterRequest, DocumentRegisterResponse,
+    DocumentBulkRegisterRequest, DocumentBulkRegisterResponse,
     DocumentDownloadStartRequest, DocumentDownloadStartResponse
 )
 from server.database.task_manager import TaskManager, ClientManager, ClientActivityTracker
 from server.database.document_manager import DocumentManager
 from server.database.cache import (
     cache_get, cache_set, cache_delete, cache_delete_pattern,
-    cache_key_task, cache_key_client_statistics, cache_key_document,
-    cache_key_tasks_summary
+    cache_key_task, cache_key_client_statistics, cache_key_client_activity,
+    cache_key_document, cache_key_tasks_summary
 )
 from server.api.auth import verify_api_key
+from server.database.connection import db_conn
 from server.config import config
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix=f"/api/{config.api_version}", tags=["download"])
+router = APIRouter(
+    prefix=f"/api/{config.api_version}",
+    tags=["download"]
+)
 
 
-@router.post("/tasks/request", response_model=TaskResponse)
+@router.post("/tasks/request", response_model=TaskResponse, dependencies=[Depends(db_conn)])
 async def request_task(
     request: TaskRequest,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -60,6 +66,7 @@ async def request_task(
     # Invalidate task cache
     cache_delete(cache_key_task(task['id']))
     cache_delete_pattern("cache:tasks_summary:*")
+    cache_delete(cache_key_client_activity(client_id))
     
     return TaskResponse(
         task_id=task['id'],
@@ -70,7 +77,7 @@ async def request_task(
     )
 
 
-@router.post("/tasks/complete", response_model=TaskCompleteResponse)
+@router.post("/tasks/complete", response_model=TaskCompleteResponse, dependencies=[Depends(db_conn)])
 async def complete_task(
     request: TaskCompleteRequest,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -114,6 +121,7 @@ async def complete_task(
     cache_delete_pattern("cache:tasks_summary:*")
     if client_id and client_id != "anonymous":
         cache_delete(cache_key_client_statistics(client_id))
+        cache_delete(cache_key_client_activity(client_id))
     
     return TaskCompleteResponse(
         success=True,
@@ -121,7 +129,7 @@ async def complete_task(
     )
 
 
-@router.post("/tasks/create", response_model=TaskCreateResponse)
+@router.post("/tasks/create", response_model=TaskCreateResponse, dependencies=[Depends(db_conn)])
 async def create_task(
     request: TaskCreateRequest,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -147,7 +155,31 @@ async def create_task(
     )
 
 
-@router.get("/tasks/{task_id}", response_model=TaskStatusResponse)
+@router.post("/tasks/create-bulk", response_model=TaskBulkCreateResponse, dependencies=[Depends(db_conn)])
+async def create_tasks_bulk(
+    request: TaskBulkCreateRequest,
+    client_id: Optional[str] = Depends(verify_api_key)
+):
+    """
+    Create many download tasks in one request
+    """
+    task_ids = TaskManager.create_tasks([task.dict() for task in request.tasks])
+    
+    if request.tasks and not task_ids:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create tasks"
+        )
+    
+    cache_delete_pattern("cache:tasks_summary:*")
+    
+    return TaskBulkCreateResponse(
+        task_ids=task_ids,
+        message=f"Created {len(task_ids)} tasks"
+    )
+
+
+@router.get("/tasks/{task_id}", response_model=TaskStatusResponse, dependencies=[Depends(db_conn)])
 async def get_task_status(
     task_id: str,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -192,7 +224,7 @@ async def get_task_status(
     return task_response
 
 
-@router.get("/tasks/{task_id}/download-statistics", response_model=dict)
+@router.get("/tasks/{task_id}/download-statistics", response_model=dict, dependencies=[Depends(db_conn)])
 async def get_task_download_statistics(
     task_id: str,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -219,7 +251,7 @@ async def get_task_download_statistics(
     return statistics
 
 
-@router.get("/tasks", response_model=TasksSummaryResponse)
+@router.get("/tasks", response_model=TasksSummaryResponse, dependencies=[Depends(db_conn)])
 async def get_tasks_summary(
     status_filter: Optional[str] = None,
     limit: int = 100,
@@ -285,7 +317,7 @@ async def get_tasks_summary(
     return summary
 
 
-@router.post("/clients/register", response_model=ClientRegisterResponse)
+@router.post("/clients/register", response_model=ClientRegisterResponse, dependencies=[Depends(db_conn)])
 async def register_client(request: ClientRegisterRequest):
     """
     Register a new download client
@@ -308,7 +340,7 @@ async def register_client(request: ClientRegisterRequest):
     )
 
 
-@router.post("/clients/heartbeat", response_model=ClientHeartbeatResponse)
+@router.post("/clients/heartbeat", response_model=ClientHeartbeatResponse, dependencies=[Depends(db_conn)])
 async def client_heartbeat(
     request: ClientHeartbeatRequest,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -336,7 +368,7 @@ async def client_heartbeat(
     )
 
 
-@router.get("/clients", response_model=ClientsSummaryResponse)
+@router.get("/clients", response_model=ClientsSummaryResponse, dependencies=[Depends(db_conn)])
 async def get_clients_summary(
     client_id: Optional[str] = Depends(verify_api_key)
 ):
@@ -354,7 +386,7 @@ async def get_clients_summary(
     )
 
 
-@router.post("/tasks/reset-stale", response_model=dict)
+@router.post("/tasks/reset-stale", response_model=dict, dependencies=[Depends(db_conn)])
 async def reset_stale_tasks(
     client_id: Optional[str] = Depends(verify_api_key)
 ):
@@ -363,6 +395,10 @@ async def reset_stale_tasks(
     """
     reset_count = TaskManager.reset_stale_tasks()
     
+    # Reset tasks were unassigned from their clients
+    if reset_count:
+        cache_delete_pattern("cache:client_activity:*")
+    
     return {
         "success": True,
         "reset_count": reset_count,
@@ -370,25 +406,11 @@ async def reset_stale_tasks(
     }
 
 
-@router.post("/documents/register", response_model=DocumentRegisterResponse)
-async def register_document(
+def _register_document(
     request: DocumentRegisterRequest,
-    client_id: Optional[str] = Depends(verify_api_key)
-):
-    """
-    Register a document with metadata and classification
-    
-    Server assigns system_id (UUID) and classifies document based on:
-    - Search parameters (court_region, instance_type)
-    - Extracted metadata (court_name, etc.)
-    """
-    if not client_id:
-        client_id = "anonymous"
-    
-    # Update client heartbeat
-    if client_id != "anonymous":
-        ClientManager.update_heartbeat(client_id)
-    
+    client_id: str
+) -> Optional[DocumentRegisterResponse]:
+    """Register one document and build its response (None on failure)"""
     # Convert metadata to dict
     metadata_dict = request.metadata.dict(exclude_none=True)
     
@@ -401,10 +423,7 @@ async def register_document(
     )
     
     if not system_id:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to register document"
-        )
+        return None
     
     # Build classification response
     classification_response = None
@@ -425,7 +444,65 @@ async def register_document(
     )
 
 
-@router.get("/documents/{system_id}", response_model=dict)
+@router.post("/documents/register", response_model=DocumentRegisterResponse, dependencies=[Depends(db_conn)])
+async def register_document(
+    request: DocumentRegisterRequest,
+    client_id: Optional[str] = Depends(verify_api_key)
+):
+    """
+    Register a document with metadata and classification
+    
+    Server assigns system_id (UUID) and classifies document based on:
+    - Search parameters (court_region, instance_type)
+    - Extracted metadata (court_name, etc.)
+    """
+    if not client_id:
+        client_id = "anonymous"
+    
+    # Update client heartbeat
+    if client_id != "anonymous":
+        ClientManager.update_heartbeat(client_id)
+    
+    response = _register_document(request, client_id)
+    
+    if not response:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to register document"
+        )
+    
+    return response
+
+
+@router.post("/documents/register-bulk", response_model=DocumentBulkRegisterResponse, dependencies=[Depends(db_conn)])
+async def register_documents_bulk(
+    request: DocumentBulkRegisterRequest,
+    client_id: Optional[str] = Depends(verify_api_key)
+):
+    """
+    Register a batch of documents in one request
+    
+    Clients buffer registrations and flush them here, paying one HTTP
+    round-trip and one pooled connection per batch instead of per document.
+    """
+    if not client_id:
+        client_id = "anonymous"
+    
+    # Update client heartbeat
+    if client_id != "anonymous":
+        ClientManager.update_heartbeat(client_id)
+    
+    results = [_register_document(document, client_id) for document in request.documents]
+    registered = sum(1 for result in results if result)
+    
+    return DocumentBulkRegisterResponse(
+        registered=registered,
+        failed=len(results) - registered,
+        results=results
+    )
+
+
+@router.get("/documents/{system_id}", response_model=dict, dependencies=[Depends(db_conn)])
 async def get_document(
     system_id: str,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -453,7 +530,7 @@ async def get_document(
     return document
 
 
-@router.get("/clients/{client_id}/statistics", response_model=dict)
+@router.get("/clients/{client_id}/statistics", response_model=dict, dependencies=[Depends(db_conn)])
 async def get_client_statistics(
     client_id: str,
     requesting_client_id: Optional[str] = Depends(verify_api_key)
@@ -492,7 +569,7 @@ async def get_client_statistics(
     return statistics
 
 
-@router.get("/clients/me/statistics", response_model=dict)
+@router.get("/clients/me/statistics", response_model=dict, dependencies=[Depends(db_conn)])
 async def get_my_statistics(
     client_id: Optional[str] = Depends(verify_api_key)
 ):
@@ -516,7 +593,7 @@ async def get_my_statistics(
     return statistics
 
 
-@router.post("/tasks/document-download-start", response_model=DocumentDownloadStartResponse)
+@router.post("/tasks/document-download-start", response_model=DocumentDownloadStartResponse, dependencies=[Depends(db_conn)])
 async def document_download_start(
     request: DocumentDownloadStartRequest,
     client_id: Optional[str] = Depends(verify_api_key)
@@ -540,13 +617,22 @@ async def document_download_start(
             detail=f"Task {request.task_id} not found"
         )
     
-    # Record document download start
-    success = TaskManager.record_document_download_start(
+    # Record document download start: plain INSERT first, full UPSERT only
+    # when the document was already recorded (retry after a failure)
+    progress_client_id = client_id if client_id != "anonymous" else None
+    success = TaskManager.record_document_download_start_insert_only(
         task_id=request.task_id,
         document_id=request.document_id,
         reg_number=request.reg_number,
-        client_id=client_id if client_id != "anonymous" else None
+        client_id=progress_client_id
     )
+    if not success:
+        success = TaskManager.record_document_download_start(
+            task_id=request.task_id,
+            document_id=request.document_id,
+            reg_number=request.reg_number,
+            client_id=progress_client_id
+        )
     
     if not success:
         raise HTTPException(
@@ -572,9 +658,13 @@ async def get_client_activity(
     """
     Get real-time activity for a specific client
     """
-    from server.database.task_manager import ClientActivityTracker
+    # Try cache first (dashboards poll this endpoint continuously)
+    cache_key = cache_key_client_activity(client_id)
+    cached_activity = cache_get(cache_key)
+    if cached_activity:
+        return cached_activity
     
-    activity = ClientActivityTracker.get_client_activity(client_id)
+    activity = await ClientActivityTracker.get_client_activity(client_id)
     
     if not activity:
         raise HTTPException(
@@ -582,10 +672,13 @@ async def get_client_activity(
             detail=f"Client {client_id} not found or no activity"
         )
     
+    # Cache activity; task state changes for this client invalidate it
+    cache_set(cache_key, activity, ttl=config.cache_ttl_activity)
+    
     return activity
 
 
-@router.get("/tasks/indexes", response_model=list)
+@router.get("/tasks/indexes", response_model=list, dependencies=[Depends(db_conn)])
 async def get_task_indexes(
     client_id: Optional[str] = Depends(verify_api_key)
 ):
@@ -596,7 +689,7 @@ async def get_task_indexes(
     return indexes
 
 
-@router.get("/tasks/by-index", response_model=list)
+@router.get("/tasks/by-index", response_model=list, dependencies=[Depends(db_conn)])
 async def get_tasks_by_index(
     court_region: str,
     instance_type: str,
@@ -5,11 +5,16 @@ from fastapi import APIRouter, HTTPException, Depends, status, Header
 from pydantic import BaseModel
 from typing import Optional
 import logging
+import redis
 from server.database.webauthn_manager import WebAuthnManager
+from server.database.connection import db_conn
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/v1/users", tags=["users"])
+router = APIRouter(
+    prefix="/api/v1/users",
+    tags=["users"]
+)
 
 
 class UserResponse(BaseModel):
@@ -41,7 +46,14 @@ def get_current_user_id(
     else:
         token = authorization
     
-    return WebAuthnManager.get_user_by_token(token)
+    try:
+        return WebAuthnManager.get_user_by_token(token)
+    except redis.RedisError as e:
+        logger.error(f"Auth store unavailable while checking token: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication store unavailable"
+        )
 
 
 @router.get("/me", response_model=UserResponse)
@@ -53,7 +65,7 @@ async def get_profile(user_id: Optional[str] = Depends(get_current_user_id)):
             detail="Authentication required"
         )
     
-    user = WebAuthnManager.get_user(user_id)
+    user = await WebAuthnManager.get_user(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -71,7 +83,7 @@ async def get_profile(user_id: Optional[str] = Depends(get_current_user_id)):
     )
 
 
-@router.patch("/me", response_model=UserResponse)
+@router.patch("/me", response_model=UserResponse, dependencies=[Depends(db_conn)])
 async def update_profile(
     request: UpdateUserRequest,
     user_id: Optional[str] = Depends(get_current_user_id)
@@ -125,6 +137,7 @@ async def update_profile(
         user = cur.fetchone()
         conn.commit()
         cur.close()
+        WebAuthnManager.invalidate_user(user_id)
         
         if not user:
             raise HTTPException(
@@ -7,12 +7,16 @@ from typing import Optional, List
 import base64
 import secrets
 import logging
+import redis
 from server.database.webauthn_manager import WebAuthnManager
-from server.database.connection import get_db_connection, return_db_connection
+from server.database.connection import db_conn
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/v1/auth/webauthn", tags=["auth"])
+router = APIRouter(
+    prefix="/api/v1/auth/webauthn",
+    tags=["auth"]
+)
 
 
 class RegisterStartRequest(BaseModel):
@@ -100,6 +104,12 @@ async def register_start(request: RegisterStartRequest):
         WebAuthnManager.store_challenge(request.username, challenge, "register")
         
         return response
+    except redis.RedisError as e:
+        logger.error(f"Auth store unavailable in register_start: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication store unavailable"
+        )
     except Exception as e:
         logger.error(f"Error in register_start: {e}")
         raise HTTPException(
@@ -108,7 +118,7 @@ async def register_start(request: RegisterStartRequest):
         )
 
 
-@router.post("/register/complete", response_model=AuthResponse)
+@router.post("/register/complete", response_model=AuthResponse, dependencies=[Depends(db_conn)])
 async def register_complete(request: RegisterCompleteRequest):
     """Complete WebAuthn registration"""
     try:
@@ -139,6 +149,12 @@ async def register_complete(request: RegisterCompleteRequest):
                 "displayName": "User"
             }
         )
+    except redis.RedisError as e:
+        logger.error(f"Auth store unavailable in register_complete: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication store unavailable"
+        )
     except Exception as e:
         logger.error(f"Error in register_complete: {e}")
         raise HTTPException(
@@ -147,7 +163,7 @@ async def register_complete(request: RegisterCompleteRequest):
         )
 
 
-@router.post("/login/start", response_model=LoginStartResponse)
+@router.post("/login/start", response_model=LoginStartResponse, dependencies=[Depends(db_conn)])
 async def login_start(request: LoginStartRequest):
     """Start WebAuthn login"""
     try:
@@ -182,6 +198,12 @@ async def login_start(request: LoginStartRequest):
         )
     except HTTPException:
         raise
+    except redis.RedisError as e:
+        logger.error(f"Auth store unavailable in login_start: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication store unavailable"
+        )
     except Exception as e:
         logger.error(f"Error in login_start: {e}")
         raise HTTPException(
@@ -198,7 +220,7 @@ async def login_complete(request: LoginCompleteRequest):
         # For now, we'll verify and return a token
         
         # Get user by credential ID
-        user_id = WebAuthnManager.verify_credential(request.id)
+        user_id = await WebAuthnManager.verify_credential(request.id)
         
         if not user_id:
             raise HTTPException(
@@ -211,7 +233,7 @@ async def login_complete(request: LoginCompleteRequest):
         WebAuthnManager.store_token(token, user_id)
         
         # Get user info
-        user = WebAuthnManager.get_user(user_id)
+        user = await WebAuthnManager.get_user(user_id)
         
         return AuthResponse(
             token=token,
@@ -223,6 +245,12 @@ async def login_complete(request: LoginCompleteRequest):
         )
     except HTTPException:
         raise
+    except redis.RedisError as e:
+        logger.error(f"Auth store unavailable in login_complete: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication store unavailable"
+        )
     except Exception as e:
         logger.error(f"Error in login_complete: {e}")
         raise HTTPException(
@@ -21,6 +21,8 @@ class ServerConfig(BaseSettings):
     api_port: int = int(os.getenv("API_PORT", "8000"))
     api_title: str = "Reyestr Download Server API"
     api_version: str = "v1"
+    api_workers: int = int(os.getenv("WEB_CONCURRENCY", "1"))  # Same variable uvicorn reads for --workers
+    api_reload: bool = os.getenv("API_RELOAD", "false").lower() == "true"  # Development only
     
     # Security
     api_key_header: str = "X-API-Key"
@@ -35,6 +37,11 @@ class ServerConfig(BaseSettings):
     db_pool_minconn: int = int(os.getenv("DB_POOL_MINCONN", "10"))
     db_pool_maxconn: int = int(os.getenv("DB_POOL_MAXCONN", "250"))  # Support 10 clients × 20 concurrent requests
     
+    # Async read pool (asyncpg) for hot read-only endpoints
+    db_read_pool_min_size: int = int(os.getenv("DB_READ_POOL_MIN_SIZE", "5"))
+    db_read_pool_max_size: int = int(os.getenv("DB_READ_POOL_MAX_SIZE", "20"))
+    db_read_pool_command_timeout: float = float(os.getenv("DB_READ_POOL_COMMAND_TIMEOUT", "5"))
+    
     # CORS
     cors_origins: list = ["*"]  # Configure for production
     
@@ -50,6 +57,14 @@ class ServerConfig(BaseSettings):
     cache_ttl_tasks: int = int(os.getenv("CACHE_TTL_TASKS", "10"))  # 10 seconds for pending tasks
     cache_ttl_statistics: int = int(os.getenv("CACHE_TTL_STATISTICS", "30"))  # 30 seconds for statistics
     cache_ttl_documents: int = int(os.getenv("CACHE_TTL_DOCUMENTS", "60"))  # 60 seconds for documents
+    cache_ttl_activity: int = int(os.getenv("CACHE_TTL_ACTIVITY", "3"))  # 3 seconds for dashboard activity polling
+    cache_ttl_credentials: int = int(os.getenv("CACHE_TTL_CREDENTIALS", "300"))  # 5 minutes for credential -> user lookups
+    cache_ttl_users: int = int(os.getenv("CACHE_TTL_USERS", "60"))  # 60 seconds for user profiles
+    
+    # Redis shared state (WebAuthn challenges, auth tokens); in-process fallback when unset.
+    # Use a separate non-evicting instance (maxmemory-policy noeviction), not the cache.
+    redis_url: Optional[str] = os.getenv("REDIS_URL", None)
+    redis_max_connections: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
     
     class Config:
         env_file = ".env"
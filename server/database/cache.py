@@ -1,11 +1,12 @@
 """
 Redis cache management for API responses and database queries
 """
-import json
 import logging
 from typing import Optional, Any, Dict
+import orjson
 import redis
 from server.config import config
+from server.database.redis_client import create_redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -22,14 +23,8 @@ def get_redis_client() -> Optional[redis.Redis]:
     
     if _redis_client is None:
         try:
-            _redis_client = redis.Redis(
-                host=config.redis_host,
-                port=config.redis_port,
-                db=config.redis_db,
-                password=config.redis_password,
-                decode_responses=True,
-                socket_connect_timeout=5,
-                socket_timeout=5,
+            _redis_client = create_redis_client(
+                f"redis://{config.redis_host}:{config.redis_port}/{config.redis_db}",
                 retry_on_timeout=True
             )
             # Test connection
@@ -55,8 +50,8 @@ def cache_get(key: str) -> Optional[Any]:
         value = client.get(key)
         if value:
             try:
-                return json.loads(value)
-            except json.JSONDecodeError:
+                return orjson.loads(value)
+            except orjson.JSONDecodeError:
                 return value
     except Exception as e:
         logger.warning(f"Cache get error for key {key}: {e}")
@@ -75,7 +70,7 @@ def cache_set(key: str, value: Any, ttl: int = 60) -> bool:
     
     try:
         if isinstance(value, (dict, list)):
-            value = json.dumps(value)
+            value = orjson.dumps(value).decode()
         client.setex(key, ttl, value)
         return True
     except Exception as e:
@@ -157,6 +152,21 @@ def cache_key_client_statistics(client_id: str) -> str:
     return f"cache:client_stats:{client_id}"
 
 
+def cache_key_client_activity(client_id: str) -> str:
+    """Generate cache key for client activity"""
+    return f"cache:client_activity:{client_id}"
+
+
+def cache_key_credential_user(credential_id: str) -> str:
+    """Generate cache key for WebAuthn credential owner"""
+    return f"cache:webauthn_credential:{credential_id}"
+
+
+def cache_key_user(user_id: str) -> str:
+    """Generate cache key for user"""
+    return f"cache:user:{user_id}"
+
+
 def cache_key_document(system_id: str) -> str:
     """Generate cache key for document"""
     return f"cache:document:{system_id}"
@@ -3,16 +3,37 @@ Database connection management
 """
 import psycopg2
 from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import RealDictCursor, execute_values
 import logging
-from typing import Optional
+from contextvars import ContextVar
+from typing import Optional, Sequence, Any, List
+from starlette.concurrency import run_in_threadpool
 from server.config import config
 
 logger = logging.getLogger(__name__)
 
+
+class PreparingConnection(PGConnection):
+    """Connection that tracks statements PREPAREd on its backend session"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+class _RequestConnection:
+    """Slot for the current API request's connection, filled on first use"""
+    
+    def __init__(self):
+        self.conn: Optional[PGConnection] = None
+
 # Connection pool
 _connection_pool: Optional[pool.ThreadedConnectionPool] = None
 
+# Connection slot of the current API request (see db_conn)
+_request_connection: ContextVar[Optional[_RequestConnection]] = ContextVar("request_connection", default=None)
+
 
 def get_connection_pool() -> pool.ThreadedConnectionPool:
     """Get or create database connection pool"""
@@ -28,6 +49,7 @@ def get_connection_pool() -> pool.ThreadedConnectionPool:
                 database=config.db_name,
                 user=config.db_user,
                 password=config.db_password,
+                connection_factory=PreparingConnection,
                 cursor_factory=RealDictCursor
             )
             logger.info(f"Database connection pool created: min={config.db_pool_minconn}, max={config.db_pool_maxconn}")
@@ -39,15 +61,64 @@ def get_connection_pool() -> pool.ThreadedConnectionPool:
 
 
 def get_db_connection():
-    """Get a database connection from the pool"""
-    pool = get_connection_pool()
-    return pool.getconn()
+    """Get a database connection, reusing the request-scoped one if active"""
+    slot = _request_connection.get()
+    if slot is None:
+        return get_connection_pool().getconn()
+    
+    # Checked out on first use, so requests that never touch psycopg2
+    # (cache hits, asyncpg reads) never hold a pooled connection
+    if slot.conn is None:
+        slot.conn = get_connection_pool().getconn()
+    elif slot.conn.closed:
+        # Broken mid-request: hand out a private one the caller returns itself
+        return get_connection_pool().getconn()
+    return slot.conn
 
 
 def return_db_connection(conn):
-    """Return a connection to the pool"""
+    """Return a connection to the pool, discarding it if it was closed"""
+    slot = _request_connection.get()
+    if slot is not None and conn is slot.conn:
+        # Released by db_conn when the request finishes
+        return
     pool = get_connection_pool()
-    pool.putconn(conn)
+    pool.putconn(conn, close=bool(conn.closed))
+
+
+def _release_request_connection(conn: PGConnection, commit: bool):
+    """Commit or roll back the request's connection and return it to the pool"""
+    try:
+        if not conn.closed:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+    finally:
+        get_connection_pool().putconn(conn, close=bool(conn.closed))
+
+
+async def db_conn():
+    """
+    FastAPI dependency sharing one pooled connection across the request.
+    
+    Attach it only to endpoints that call psycopg2 managers. Manager
+    methods called while the request is active get the shared connection
+    from get_db_connection() instead of checking out their own, so an
+    endpoint touching several managers does a single getconn/putconn. The
+    connection is checked out lazily, and the final commit/putconn runs in
+    the threadpool so it does not block the event loop.
+    """
+    slot = _RequestConnection()
+    token = _request_connection.set(slot)
+    commit = False
+    try:
+        yield
+        commit = True
+    finally:
+        _request_connection.reset(token)
+        if slot.conn is not None:
+            await run_in_threadpool(_release_request_connection, slot.conn, commit)
 
 
 def close_connection_pool():
@@ -57,3 +128,68 @@ def close_connection_pool():
         _connection_pool.closeall()
         _connection_pool = None
         logger.info("Database connection pool closed")
+
+
+def execute_prepared(cur, name: str, query: str, params: Sequence[Any] = ()):
+    """
+    Execute a server-side prepared statement, preparing it on first use.
+    
+    Hot, small queries spend most of their time in parse/plan; PREPARE runs
+    that once per backend session and later calls only EXECUTE.
+    
+    Args:
+        cur: Cursor of a pooled PreparingConnection
+        name: Statement name, unique per query text
+        query: SQL using $1..$n placeholders
+        params: Positional parameter values
+    """
+    prepared = cur.connection.prepared_statements
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {query}")
+        prepared.add(name)
+    
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def bulk_insert(
+    conn,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+    returning: Optional[str] = None,
+    page_size: int = 1000
+) -> List[Any]:
+    """
+    Insert many rows with multi-row INSERT statements (ON CONFLICT DO NOTHING)
+    
+    execute_values packs up to page_size rows into each statement, so N rows
+    cost ceil(N / page_size) round-trips instead of N.
+    
+    Args:
+        conn: Database connection (caller commits)
+        table: Target table name
+        columns: Column names, in the order of the values in each row
+        rows: Row value tuples
+        returning: Optional RETURNING clause columns
+        page_size: Rows per INSERT statement
+    
+    Returns:
+        Rows produced by the RETURNING clause (empty list without one)
+    """
+    if not rows:
+        return []
+    
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s ON CONFLICT DO NOTHING"
+    if returning:
+        query += f" RETURNING {returning}"
+    
+    cur = conn.cursor()
+    try:
+        result = execute_values(cur, query, rows, page_size=page_size, fetch=bool(returning))
+    finally:
+        cur.close()
+    return result or []
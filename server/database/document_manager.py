@@ -8,6 +8,7 @@ import re
 from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 from server.database.connection import get_db_connection, return_db_connection
+from server.database.ids import uuid7
 
 logger = logging.getLogger(__name__)
 
@@ -264,7 +265,7 @@ class DocumentManager:
             
             else:
                 # New document, create it
-                system_id = str(uuid.uuid4())
+                system_id = str(uuid7())
                 
                 # Get or create default search session
                 cur.execute("""
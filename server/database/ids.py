@@ -0,0 +1,21 @@
+"""
+Time-ordered primary key generation
+"""
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a UUIDv7 (RFC 9562): 48-bit Unix timestamp in milliseconds
+    followed by random bits.
+
+    New keys sort after existing ones, so inserts land on the right-most
+    B-tree page instead of a random one, keeping primary key indexes compact.
+    """
+    ts_ms = time.time_ns() // 1_000_000
+    value = bytearray(ts_ms.to_bytes(6, "big") + os.urandom(10))
+    value[6] = 0x70 | (value[6] & 0x0F)  # version 7
+    value[8] = 0x80 | (value[8] & 0x3F)  # RFC 4122 variant
+    return uuid.UUID(bytes=bytes(value))
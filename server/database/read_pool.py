@@ -0,0 +1,68 @@
+"""
+Async connection pool for hot read-only queries
+"""
+import asyncpg
+import logging
+from typing import Optional
+import orjson
+from server.config import config
+
+logger = logging.getLogger(__name__)
+
+# asyncpg pool (created in the app lifespan so each worker owns its own)
+_read_pool: Optional[asyncpg.Pool] = None
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Decode json/jsonb columns to Python objects, as psycopg2 does"""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog"
+        )
+
+
+async def init_read_pool() -> asyncpg.Pool:
+    """Create the read-only asyncpg pool"""
+    global _read_pool
+
+    if _read_pool is None:
+        try:
+            _read_pool = await asyncpg.create_pool(
+                host=config.db_host,
+                port=config.db_port,
+                database=config.db_name,
+                user=config.db_user,
+                password=config.db_password,
+                min_size=config.db_read_pool_min_size,
+                max_size=config.db_read_pool_max_size,
+                command_timeout=config.db_read_pool_command_timeout,
+                init=_init_connection
+            )
+            logger.info(
+                f"Read pool created: min={config.db_read_pool_min_size}, "
+                f"max={config.db_read_pool_max_size}"
+            )
+        except Exception as e:
+            logger.error(f"Error creating read pool: {e}")
+            raise
+
+    return _read_pool
+
+
+def get_read_pool() -> asyncpg.Pool:
+    """Get the read-only asyncpg pool (must be initialized in lifespan)"""
+    if _read_pool is None:
+        raise RuntimeError("Read pool is not initialized")
+    return _read_pool
+
+
+async def close_read_pool():
+    """Close the read-only asyncpg pool"""
+    global _read_pool
+    if _read_pool:
+        await _read_pool.close()
+        _read_pool = None
+        logger.info("Read pool closed")
@@ -0,0 +1,63 @@
+"""
+Shared Redis client for server state that must survive across workers
+"""
+import logging
+from typing import Optional
+import redis
+from server.config import config
+
+logger = logging.getLogger(__name__)
+
+# Redis client backed by a blocking connection pool
+_redis_client: Optional[redis.Redis] = None
+
+
+def create_redis_client(url: str, **kwargs) -> redis.Redis:
+    """
+    Build a Redis client on a blocking connection pool
+
+    Used for both the response cache and the shared state store; extra
+    keyword arguments are passed on to the connections.
+    """
+    connection_pool = redis.BlockingConnectionPool.from_url(
+        url,
+        max_connections=config.redis_max_connections,
+        password=config.redis_password,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        **kwargs
+    )
+    return redis.Redis(connection_pool=connection_pool)
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Get or create the shared Redis client.
+
+    REDIS_URL must point at a Redis that never evicts keys (maxmemory-policy
+    noeviction), not at the allkeys-lru cache instance: auth tokens and
+    challenges carry TTLs, so volatile-* policies would evict them as well.
+
+    Returns None when REDIS_URL is not configured; callers then fall back
+    to in-process storage (intended for tests and local development only).
+    """
+    global _redis_client
+
+    if not config.redis_url:
+        return None
+
+    if _redis_client is None:
+        _redis_client = create_redis_client(config.redis_url)
+        logger.info(f"Redis state store configured: max_connections={config.redis_max_connections}")
+
+    return _redis_client
+
+
+def close_redis():
+    """Close the shared Redis client"""
+    global _redis_client
+    if _redis_client:
+        _redis_client.connection_pool.disconnect()
+        _redis_client = None
+        logger.info("Redis state store closed")
@@ -2,15 +2,117 @@
 Task management for distributed downloads
 """
 import uuid
-import json
+import time
 import logging
 from typing import Optional, Dict, List
 from datetime import datetime, timedelta
-from server.database.connection import get_db_connection, return_db_connection
+import orjson
+from server.database.connection import get_db_connection, return_db_connection, bulk_insert
+from server.database.ids import uuid7
+from server.database.read_pool import get_read_pool
+from server.database.redis_client import get_redis
 from server.config import config
 
 logger = logging.getLogger(__name__)
 
+# Sliding window for per-client session stats
+SESSION_WINDOW_SECONDS = 24 * 60 * 60
+
+# Sentinel member (score +inf, so window trimming never drops it) marking a
+# session set that was seeded from download_tasks. A set without it was
+# created by a write after a Redis restart or eviction and is incomplete.
+_SESSION_SEEDED_MEMBER = "seeded"
+
+
+def _session_key(client_id: str) -> str:
+    """Redis sorted set of a client's finished tasks, scored by completion time"""
+    return f"sess:{client_id}:tasks"
+
+
+def _session_member(task_id: str, documents_downloaded: int) -> str:
+    """Member carries the document count so the window can be summed on read"""
+    return f"{task_id}:{documents_downloaded}"
+
+
+def _record_session_task(client_id: str, task_id: str, documents_downloaded: int):
+    """Add a finished task to the client's 24h session window in Redis"""
+    redis_client = get_redis()
+    if not redis_client:
+        return
+    
+    try:
+        now = time.time()
+        key = _session_key(client_id)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zadd(key, {_session_member(task_id, documents_downloaded): now})
+        pipe.zremrangebyscore(key, '-inf', now - SESSION_WINDOW_SECONDS)
+        pipe.expire(key, SESSION_WINDOW_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Error recording session stats for client {client_id}: {e}")
+
+
+def _seed_session_window(client_id: str, tasks: List[Dict]):
+    """
+    Fill a client's session window from download_tasks rows (id,
+    completed_at epoch, documents_downloaded) and mark it complete
+    """
+    redis_client = get_redis()
+    if not redis_client:
+        return
+    
+    try:
+        members = {
+            _session_member(str(task['id']), task['documents_downloaded']): float(task['completed_at'])
+            for task in tasks
+        }
+        members[_SESSION_SEEDED_MEMBER] = float('inf')
+        key = _session_key(client_id)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zadd(key, members)
+        pipe.expire(key, SESSION_WINDOW_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Error seeding session stats for client {client_id}: {e}")
+
+
+def _get_session_stats(client_id: str) -> Optional[Dict]:
+    """
+    Read a client's 24h session stats from Redis.
+    
+    tasks_completed counts tasks that finished (completed or failed) in the
+    last 24 hours, by completion time; before the Redis window it counted
+    tasks started in the last 24 hours. The SQL fallback uses the same
+    definition.
+    
+    Returns None when Redis is not configured or unavailable, or when the
+    window has not been seeded (first deploy, Redis restart, eviction), in
+    which case the caller computes the stats from download_tasks instead
+    and seeds the window.
+    """
+    redis_client = get_redis()
+    if not redis_client:
+        return None
+    
+    try:
+        key = _session_key(client_id)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zremrangebyscore(key, '-inf', time.time() - SESSION_WINDOW_SECONDS)
+        pipe.zscore(key, _SESSION_SEEDED_MEMBER)
+        pipe.zrangebyscore(key, '-inf', '(+inf')
+        _, seeded, members = pipe.execute()
+    except Exception as e:
+        logger.error(f"Error reading session stats for client {client_id}: {e}")
+        return None
+    
+    if seeded is None:
+        return None
+    
+    return {
+        'tasks_completed': len(members),
+        'documents_downloaded': sum(int(member.rsplit(':', 1)[1]) for member in members)
+    }
+
 
 class TaskManager:
     """Manages download tasks in the database"""
@@ -27,7 +129,7 @@ class TaskManager:
             conn = get_db_connection()
             cur = conn.cursor()
             
-            task_id = str(uuid.uuid4())
+            task_id = str(uuid7())
             
             cur.execute("""
                 INSERT INTO download_tasks (
@@ -37,7 +139,7 @@ class TaskManager:
                 RETURNING id
             """, (
                 task_id,
-                json.dumps(search_params),
+                orjson.dumps(search_params).decode(),
                 start_page,
                 max_documents
             ))
@@ -60,6 +162,54 @@ class TaskManager:
             if conn:
                 return_db_connection(conn)
     
+    @staticmethod
+    def create_tasks(tasks: List[Dict]) -> List[str]:
+        """
+        Create many download tasks with one multi-row INSERT
+        
+        Args:
+            tasks: Dicts with search_params, start_page and max_documents
+        
+        Returns:
+            IDs of the created tasks (empty list on error)
+        """
+        conn = None
+        try:
+            conn = get_db_connection()
+            
+            rows = [
+                (
+                    str(uuid7()),
+                    orjson.dumps(task['search_params']).decode(),
+                    task['start_page'],
+                    task['max_documents'],
+                    'pending'
+                )
+                for task in tasks
+            ]
+            
+            created = bulk_insert(
+                conn,
+                'download_tasks',
+                ('id', 'search_params', 'start_page', 'max_documents', 'status'),
+                rows,
+                returning='id'
+            )
+            conn.commit()
+            
+            task_ids = [str(row['id']) for row in created]
+            logger.info(f"Created {len(task_ids)} tasks")
+            return task_ids
+            
+        except Exception as e:
+            logger.error(f"Error creating tasks: {e}")
+            if conn:
+                conn.rollback()
+            return []
+        finally:
+            if conn:
+                return_db_connection(conn)
+    
     @staticmethod
     def get_pending_task(client_id: str) -> Optional[Dict]:
         """Get a pending task and assign it to a client"""
@@ -176,34 +326,33 @@ class TaskManager:
                     result_summary = %s,
                     error_message = %s
                 WHERE id = %s
+                RETURNING client_id
             """, (
                 status,
                 documents_downloaded,
                 documents_failed,
                 documents_skipped,
-                json.dumps(result_summary) if result_summary else None,
+                orjson.dumps(result_summary).decode() if result_summary else None,
                 error_message,
                 task_id
             ))
             
+            task_row = cur.fetchone()
+            client_id_value = task_row['client_id'] if task_row else None
+            
             # Update client statistics
             cur.execute("""
                 UPDATE download_clients
                 SET 
                     total_tasks_completed = total_tasks_completed + 1,
                     total_documents_downloaded = total_documents_downloaded + %s
-                WHERE id = (SELECT client_id FROM download_tasks WHERE id = %s)
-            """, (documents_downloaded, task_id))
-            
-            # Get client info before closing connection
-            cur.execute("""
-                SELECT client_id FROM download_tasks WHERE id = %s
-            """, (task_id,))
-            task_row = cur.fetchone()
-            client_id_value = task_row['client_id'] if task_row else None
+                WHERE id = %s
+            """, (documents_downloaded, client_id_value))
             
+            # Client name is only needed for the Telegram notification,
+            # so the happy path skips this lookup entirely
             client_name = None
-            if client_id_value:
+            if error_message and client_id_value:
                 cur.execute("""
                     SELECT client_name FROM download_clients WHERE id = %s
                 """, (client_id_value,))
@@ -214,6 +363,9 @@ class TaskManager:
             cur.close()
             logger.info(f"Task {task_id} completed: {documents_downloaded} downloaded, {documents_failed} failed")
             
+            if client_id_value:
+                _record_session_task(str(client_id_value), task_id, documents_downloaded)
+            
             # Send Telegram notification for critical errors (after connection is closed)
             if error_message:
                 try:
@@ -392,6 +544,50 @@ class TaskManager:
             if conn:
                 return_db_connection(conn)
     
+    @staticmethod
+    def record_document_download_start_insert_only(
+        task_id: str,
+        document_id: str,
+        reg_number: Optional[str] = None,
+        client_id: Optional[str] = None
+    ) -> bool:
+        """
+        Record a fresh document download start without touching existing rows.
+        
+        Uses ON CONFLICT DO NOTHING so the common case (a new document) never
+        takes the UPSERT row lock or leaves a dead tuple behind. Returns False
+        when the row already exists (a retry) or on error; callers should then
+        fall back to record_document_download_start to reset the row.
+        """
+        conn = None
+        try:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            
+            cur.execute("""
+                INSERT INTO document_download_progress (
+                    task_id, document_id, reg_number, client_id, status, started_at
+                )
+                VALUES (%s, %s, %s, %s, 'in_progress', CURRENT_TIMESTAMP)
+                ON CONFLICT (task_id, document_id) DO NOTHING
+            """, (task_id, document_id, reg_number, client_id))
+            
+            inserted = cur.rowcount > 0
+            conn.commit()
+            cur.close()
+            if inserted:
+                logger.debug(f"Recorded download start for document {document_id} in task {task_id}")
+            return inserted
+            
+        except Exception as e:
+            logger.error(f"Error recording document download start: {e}")
+            if conn:
+                conn.rollback()
+            return False
+        finally:
+            if conn:
+                return_db_connection(conn)
+    
     @staticmethod
     def get_task_download_statistics(task_id: str) -> Optional[Dict]:
         """
@@ -740,38 +936,30 @@ class ClientManager:
             conn = get_db_connection()
             cur = conn.cursor()
             
+            # Rows are shaped into the API response by Postgres itself
             cur.execute("""
-                SELECT 
-                    search_params->>'CourtRegion' AS court_region,
-                    search_params->>'INSType' AS instance_type,
-                    MIN(created_at) AS date_start,
-                    MAX(created_at) AS date_end,
-                    COUNT(*) AS total_tasks,
-                    COUNT(CASE WHEN status = 'completed' THEN 1 END) AS completed_tasks,
-                    COUNT(CASE WHEN status = 'pending' THEN 1 END) AS pending_tasks,
-                    COUNT(CASE WHEN status = 'failed' THEN 1 END) AS failed_tasks
+                SELECT jsonb_build_object(
+                    'court_region', search_params->>'CourtRegion',
+                    'instance_type', search_params->>'INSType',
+                    'date_range', jsonb_build_object(
+                        'start', COALESCE(to_char(MIN(created_at), 'YYYY-MM-DD"T"HH24:MI:SS'), ''),
+                        'end', COALESCE(to_char(MAX(created_at), 'YYYY-MM-DD"T"HH24:MI:SS'), '')
+                    ),
+                    'total_tasks', COUNT(*),
+                    'completed_tasks', COUNT(*) FILTER (WHERE status = 'completed'),
+                    'pending_tasks', COUNT(*) FILTER (WHERE status = 'pending'),
+                    'failed_tasks', COUNT(*) FILTER (WHERE status = 'failed'),
+                    'tasks', '[]'::jsonb
+                ) AS idx
                 FROM download_tasks
                 WHERE search_params->>'CourtRegion' IS NOT NULL
                   AND search_params->>'INSType' IS NOT NULL
                 GROUP BY search_params->>'CourtRegion', search_params->>'INSType'
-                ORDER BY court_region, instance_type
+                ORDER BY search_params->>'CourtRegion', search_params->>'INSType'
             """)
             
-            indexes = []
-            for row in cur.fetchall():
-                indexes.append({
-                    'court_region': row['court_region'],
-                    'instance_type': row['instance_type'],
-                    'date_range': {
-                        'start': row['date_start'].isoformat() if row['date_start'] else '',
-                        'end': row['date_end'].isoformat() if row['date_end'] else ''
-                    },
-                    'total_tasks': row['total_tasks'],
-                    'completed_tasks': row['completed_tasks'],
-                    'pending_tasks': row['pending_tasks'],
-                    'failed_tasks': row['failed_tasks'],
-                    'tasks': []  # Will be loaded separately
-                })
+            # Tasks themselves are loaded separately via get_tasks_by_index
+            indexes = [row['idx'] for row in cur]
             
             cur.close()
             return indexes
@@ -835,114 +1023,157 @@ class ClientManager:
 class ClientActivityTracker:
     """Tracks real-time client activity"""
     
-    # In-memory storage for activity (use Redis in production)
-    _activity: Dict[str, Dict] = {}
-    
     @staticmethod
-    def get_client_activity(client_id: str) -> Optional[Dict]:
+    async def get_client_activity(client_id: str) -> Optional[Dict]:
         """Get current activity for a client"""
-        from datetime import datetime, timedelta
-        
-        conn = None
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
+            # Session stats come from the Redis window when available; the
+            # session_tasks CTE is then gated off by $2 (a one-time filter,
+            # so download_tasks is not scanned). Otherwise its rows give the
+            # stats and seed the window.
+            session_counts = _get_session_stats(client_id)
+            
+            # Current task, 24h session stats, lifetime stats and recent errors
+            # are fetched in a single round-trip. Timestamps are stored as UTC
+            # and rendered as ISO 8601 by Postgres, so no datetime objects are
+            # built in Python.
+            async with get_read_pool().acquire() as conn:
+                row = await conn.fetchrow("""
+                    WITH clock AS (
+                        SELECT 
+                            now() AT TIME ZONE 'UTC' AS now_utc,
+                            (now() AT TIME ZONE 'UTC') - INTERVAL '24 hours' AS session_start
+                    ),
+                    current_task AS (
+                        SELECT 
+                            id, search_params, start_page, max_documents, status,
+                            started_at, documents_downloaded, documents_failed
+                        FROM download_tasks
+                        WHERE client_id = $1
+                          AND status IN ('in_progress', 'assigned')
+                        ORDER BY started_at DESC
+                        LIMIT 1
+                    ),
+                    session_tasks AS (
+                        SELECT 
+                            id,
+                            EXTRACT(EPOCH FROM completed_at) AS completed_at,
+                            COALESCE(documents_downloaded, 0) AS documents_downloaded
+                        FROM download_tasks, clock
+                        WHERE $2::boolean
+                          AND client_id = $1
+                          AND status IN ('completed', 'failed')
+                          AND completed_at >= clock.session_start
+                    ),
+                    lifetime_stats AS (
+                        SELECT 
+                            total_tasks_completed AS total_tasks,
+                            total_documents_downloaded AS total_documents
+                        FROM download_clients
+                        WHERE id = $1
+                    ),
+                    recent_errors AS (
+                        SELECT id, error_message, completed_at
+                        FROM download_tasks
+                        WHERE client_id = $1
+                          AND error_message IS NOT NULL
+                        ORDER BY completed_at DESC
+                        LIMIT 10
+                    )
+                    SELECT 
+                        ct.id AS current_task_id,
+                        ct.search_params,
+                        ct.start_page,
+                        ct.max_documents,
+                        ct.status,
+                        to_char(ct.started_at, 'YYYY-MM-DD"T"HH24:MI:SS.MS"Z"') AS started_at_iso,
+                        EXTRACT(EPOCH FROM (clock.now_utc - ct.started_at)) AS elapsed_seconds,
+                        ct.documents_downloaded AS current_documents_downloaded,
+                        ct.documents_failed AS current_documents_failed,
+                        (
+                            SELECT COALESCE(
+                                json_agg(
+                                    json_build_object(
+                                        'id', st.id,
+                                        'completed_at', st.completed_at,
+                                        'documents_downloaded', st.documents_downloaded
+                                    )
+                                ),
+                                '[]'::json
+                            )
+                            FROM session_tasks st
+                        ) AS session_tasks,
+                        to_char(clock.session_start, 'YYYY-MM-DD"T"HH24:MI:SS.MS"Z"') AS session_start_iso,
+                        ls.total_tasks,
+                        ls.total_documents,
+                        (
+                            SELECT COALESCE(
+                                json_agg(
+                                    json_build_object(
+                                        'id', re.id,
+                                        'error_message', re.error_message,
+                                        'timestamp', to_char(re.completed_at, 'YYYY-MM-DD"T"HH24:MI:SS.MS"Z"')
+                                    )
+                                    ORDER BY re.completed_at DESC
+                                ),
+                                '[]'::json
+                            )
+                            FROM recent_errors re
+                        ) AS errors
+                    FROM clock
+                    LEFT JOIN current_task ct ON TRUE
+                    LEFT JOIN lifetime_stats ls ON TRUE
+                """, client_id, session_counts is None)
             
-            # Get current active task
-            cur.execute("""
-                SELECT 
-                    id, search_params, start_page, max_documents, status,
-                    started_at, documents_downloaded, documents_failed
-                FROM download_tasks
-                WHERE client_id = %s
-                  AND status IN ('in_progress', 'assigned')
-                ORDER BY started_at DESC
-                LIMIT 1
-            """, (client_id,))
-            
-            current_task_row = cur.fetchone()
             current_task = None
-            
-            if current_task_row:
+            if row['current_task_id']:
                 # Calculate speed (simplified - in production, track document timestamps)
-                started_at = current_task_row['started_at']
-                if started_at:
-                    elapsed_minutes = (datetime.utcnow() - started_at).total_seconds() / 60
-                    if elapsed_minutes > 0:
-                        speed = current_task_row['documents_downloaded'] / elapsed_minutes
-                    else:
-                        speed = 0
+                elapsed_seconds = row['elapsed_seconds']
+                if elapsed_seconds and elapsed_seconds > 0:
+                    speed = row['current_documents_downloaded'] / (float(elapsed_seconds) / 60)
                 else:
                     speed = 0
                 
                 current_task = {
-                    'task_id': str(current_task_row['id']),
-                    'search_params': current_task_row['search_params'],
-                    'start_page': current_task_row['start_page'],
-                    'max_documents': current_task_row['max_documents'],
-                    'status': current_task_row['status'],
-                    'started_at': current_task_row['started_at'].isoformat() if current_task_row['started_at'] else None,
-                    'documents_downloaded': current_task_row['documents_downloaded'],
-                    'documents_failed': current_task_row['documents_failed'],
+                    'task_id': str(row['current_task_id']),
+                    'search_params': row['search_params'],
+                    'start_page': row['start_page'],
+                    'max_documents': row['max_documents'],
+                    'status': row['status'],
+                    'started_at': row['started_at_iso'],
+                    'documents_downloaded': row['current_documents_downloaded'],
+                    'documents_failed': row['current_documents_failed'],
                     'speed_docs_per_minute': speed
                 }
             
-            # Get session stats (tasks started in last 24 hours)
-            session_start = datetime.utcnow() - timedelta(hours=24)
-            cur.execute("""
-                SELECT 
-                    COUNT(*) AS tasks_completed,
-                    SUM(documents_downloaded) AS documents_downloaded
-                FROM download_tasks
-                WHERE client_id = %s
-                  AND started_at >= %s
-            """, (client_id, session_start))
-            
-            session_stats_row = cur.fetchone()
+            if session_counts is None:
+                session_tasks = row['session_tasks']
+                session_counts = {
+                    'documents_downloaded': sum(task['documents_downloaded'] for task in session_tasks),
+                    'tasks_completed': len(session_tasks)
+                }
+                _seed_session_window(client_id, session_tasks)
             session_stats = {
-                'documents_downloaded': session_stats_row['documents_downloaded'] or 0,
-                'tasks_completed': session_stats_row['tasks_completed'] or 0,
-                'start_time': session_start.isoformat()
+                'documents_downloaded': session_counts['documents_downloaded'],
+                'tasks_completed': session_counts['tasks_completed'],
+                'start_time': row['session_start_iso']
             }
             
-            # Get lifetime stats
-            cur.execute("""
-                SELECT 
-                    total_tasks_completed AS total_tasks,
-                    total_documents_downloaded AS total_documents
-                FROM download_clients
-                WHERE id = %s
-            """, (client_id,))
-            
-            lifetime_row = cur.fetchone()
             lifetime_stats = {
-                'total_documents': lifetime_row['total_documents'] or 0 if lifetime_row else 0,
-                'total_tasks': lifetime_row['total_tasks'] or 0 if lifetime_row else 0
+                'total_documents': row['total_documents'] or 0,
+                'total_tasks': row['total_tasks'] or 0
             }
             
-            # Get recent errors
-            cur.execute("""
-                SELECT 
-                    id, error_message, completed_at, id AS task_id
-                FROM download_tasks
-                WHERE client_id = %s
-                  AND error_message IS NOT NULL
-                ORDER BY completed_at DESC
-                LIMIT 10
-            """, (client_id,))
-            
             errors = [
                 {
-                    'id': str(row['id']),
-                    'error_message': row['error_message'],
-                    'timestamp': row['completed_at'].isoformat() if row['completed_at'] else None,
-                    'task_id': str(row['task_id'])
+                    'id': str(error['id']),
+                    'error_message': error['error_message'],
+                    'timestamp': error['timestamp'],
+                    'task_id': str(error['id'])
                 }
-                for row in cur.fetchall()
+                for error in row['errors']
             ]
             
-            cur.close()
-            
             return {
                 'client_id': client_id,
                 'current_task': current_task,
@@ -954,6 +1185,3 @@ class ClientActivityTracker:
         except Exception as e:
             logger.error(f"Error getting client activity: {e}")
             return None
-        finally:
-            if conn:
-                return_db_connection(conn)
@@ -1,18 +1,57 @@
 """
 WebAuthn credential and user management
 """
-import uuid
-import json
 import logging
-from typing import Optional, Dict, List
-from datetime import datetime, timedelta
-from server.database.connection import get_db_connection, return_db_connection
+import time
+from typing import Optional, Dict, List, Tuple
+import orjson
+from server.database.connection import get_db_connection, return_db_connection, execute_prepared
+from server.database.ids import uuid7
+from server.database.redis_client import get_redis
+from server.database.read_pool import get_read_pool
+from server.database.cache import (
+    cache_get, cache_set, cache_delete, cache_key_credential_user, cache_key_user
+)
+from server.config import config
 
 logger = logging.getLogger(__name__)
 
-# In-memory storage for challenges (use Redis in production)
-_challenges: Dict[str, Dict] = {}
-_tokens: Dict[str, str] = {}
+# Lifetimes of WebAuthn challenges and auth tokens
+CHALLENGE_TTL_SECONDS = 600
+TOKEN_TTL_SECONDS = 3600
+
+# Auth state lives in the Redis state store (get_redis); redis.RedisError is
+# left to the API layer, which answers 503.
+# In-process fallback used only when REDIS_URL is not configured (tests).
+# Entries are (value, expires_at on the monotonic clock) and expire lazily.
+_local_store: Dict[str, Tuple[str, float]] = {}
+
+
+def _local_set(key: str, value: str, ttl: int):
+    """Store a value in the in-process fallback with a TTL"""
+    _local_store[key] = (value, time.monotonic() + ttl)
+
+
+def _local_get(key: str) -> Optional[str]:
+    """Get a value from the in-process fallback, dropping it if expired"""
+    entry = _local_store.get(key)
+    if entry is None:
+        return None
+    value, expires_at = entry
+    if time.monotonic() > expires_at:
+        _local_store.pop(key, None)
+        return None
+    return value
+
+
+def _challenge_key(username: str, type: str) -> str:
+    """Redis key for a pending WebAuthn challenge"""
+    return f"wa:ch:{username}:{type}"
+
+
+def _token_key(token: str) -> str:
+    """Redis key for an authentication token"""
+    return f"wa:tok:{token}"
 
 
 class WebAuthnManager:
@@ -21,25 +60,21 @@ class WebAuthnManager:
     @staticmethod
     def store_challenge(username: str, challenge: str, type: str):
         """Store challenge temporarily"""
-        key = f"{username}:{type}"
-        _challenges[key] = {
-            "challenge": challenge,
-            "username": username,
-            "type": type,
-            "created_at": datetime.utcnow()
-        }
-        # Clean up old challenges
-        cutoff = datetime.utcnow() - timedelta(minutes=10)
-        _challenges.clear()  # Simplified - in production, use TTL
+        key = _challenge_key(username, type)
+        r = get_redis()
+        if r is None:
+            _local_set(key, challenge, CHALLENGE_TTL_SECONDS)
+            return
+        r.setex(key, CHALLENGE_TTL_SECONDS, challenge)
     
     @staticmethod
     def get_challenge(username: str, type: str) -> Optional[str]:
         """Get stored challenge"""
-        key = f"{username}:{type}"
-        challenge_data = _challenges.get(key)
-        if challenge_data:
-            return challenge_data["challenge"]
-        return None
+        key = _challenge_key(username, type)
+        r = get_redis()
+        if r is None:
+            return _local_get(key)
+        return r.get(key)
     
     @staticmethod
     def create_user_with_credential(credential_id: str, public_key: List[int], username: str) -> str:
@@ -59,24 +94,25 @@ class WebAuthnManager:
                 user_id = str(user['id'])
             else:
                 # Create new user
-                user_id = str(uuid.uuid4())
+                user_id = str(uuid7())
                 cur.execute("""
                     INSERT INTO users (id, username, display_name, created_at)
                     VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
                 """, (user_id, username, username))
             
             # Store credential
-            credential_uuid = str(uuid.uuid4())
+            credential_uuid = str(uuid7())
             cur.execute("""
                 INSERT INTO webauthn_credentials (
                     id, user_id, credential_id, public_key, created_at
                 )
                 VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
                 ON CONFLICT (credential_id) DO NOTHING
-            """, (credential_uuid, user_id, credential_id, json.dumps(public_key)))
+            """, (credential_uuid, user_id, credential_id, orjson.dumps(public_key).decode()))
             
             conn.commit()
             cur.close()
+            cache_delete(cache_key_credential_user(credential_id))
             return user_id
             
         except Exception as e:
@@ -96,11 +132,11 @@ class WebAuthnManager:
             conn = get_db_connection()
             cur = conn.cursor()
             
-            cur.execute("""
+            execute_prepared(cur, "webauthn_user_credentials", """
                 SELECT wc.credential_id, wc.public_key
                 FROM webauthn_credentials wc
                 JOIN users u ON u.id = wc.user_id
-                WHERE u.username = %s
+                WHERE u.username = $1
             """, (username,))
             
             credentials = [
@@ -122,66 +158,77 @@ class WebAuthnManager:
                 return_db_connection(conn)
     
     @staticmethod
-    def verify_credential(credential_id: str) -> Optional[str]:
+    async def verify_credential(credential_id: str) -> Optional[str]:
         """Verify credential and return user ID"""
-        conn = None
+        cache_key = cache_key_credential_user(credential_id)
+        cached_user_id = cache_get(cache_key)
+        if cached_user_id:
+            return str(cached_user_id)
+        
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT user_id FROM webauthn_credentials
-                WHERE credential_id = %s
-            """, (credential_id,))
-            
-            result = cur.fetchone()
-            cur.close()
+            async with get_read_pool().acquire() as conn:
+                result = await conn.fetchrow("""
+                    SELECT user_id FROM webauthn_credentials
+                    WHERE credential_id = $1
+                """, credential_id)
             
             if result:
-                return str(result['user_id'])
+                user_id = str(result['user_id'])
+                cache_set(cache_key, user_id, ttl=config.cache_ttl_credentials)
+                return user_id
             return None
             
         except Exception as e:
             logger.error(f"Error verifying credential: {e}")
             return None
-        finally:
-            if conn:
-                return_db_connection(conn)
     
     @staticmethod
     def store_token(token: str, user_id: str):
         """Store authentication token"""
-        _tokens[token] = user_id
+        key = _token_key(token)
+        r = get_redis()
+        if r is None:
+            _local_set(key, user_id, TOKEN_TTL_SECONDS)
+            return
+        r.setex(key, TOKEN_TTL_SECONDS, user_id)
     
     @staticmethod
     def get_user_by_token(token: str) -> Optional[str]:
         """Get user ID by token"""
-        return _tokens.get(token)
+        key = _token_key(token)
+        r = get_redis()
+        if r is None:
+            return _local_get(key)
+        return r.get(key)
     
     @staticmethod
-    def get_user(user_id: str) -> Dict:
+    def invalidate_user(user_id: str):
+        """Drop cached user information after the user row changes"""
+        cache_delete(cache_key_user(user_id))
+    
+    @staticmethod
+    async def get_user(user_id: str) -> Dict:
         """Get user information"""
-        conn = None
+        cache_key = cache_key_user(user_id)
+        cached_user = cache_get(cache_key)
+        if cached_user:
+            return cached_user
+        
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
-            
-            cur.execute("""
-                SELECT id, username, display_name, email, telegram_chat_id
-                FROM users
-                WHERE id = %s
-            """, (user_id,))
-            
-            user = cur.fetchone()
-            cur.close()
+            async with get_read_pool().acquire() as conn:
+                user = await conn.fetchrow("""
+                    SELECT id, username, display_name, email, telegram_chat_id
+                    FROM users
+                    WHERE id = $1
+                """, user_id)
             
             if user:
-                return dict(user)
+                user_dict = dict(user)
+                user_dict['id'] = str(user_dict['id'])
+                cache_set(cache_key, user_dict, ttl=config.cache_ttl_users)
+                return user_dict
             return {}
             
         except Exception as e:
             logger.error(f"Error getting user: {e}")
             return {}
-        finally:
-            if conn:
-                return_db_connection(conn)
@@ -2,6 +2,7 @@
 Main FastAPI application for download server
 """
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
@@ -9,7 +10,11 @@ from server.config import config
 from server.api.routes import router
 from server.api.webauthn import router as webauthn_router
 from server.api.users import router as users_router
-from server.database.connection import get_connection_pool, close_connection_pool
+from server.database.connection import (
+    get_connection_pool, close_connection_pool, get_db_connection, return_db_connection
+)
+from server.database.redis_client import get_redis, close_redis
+from server.database.read_pool import init_read_pool, close_read_pool
 
 # Configure logging
 logging.basicConfig(
@@ -28,23 +33,51 @@ async def lifespan(app: FastAPI):
         # Initialize database connection pool
         get_connection_pool()
         logger.info("Database connection pool initialized")
+        await init_read_pool()
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
     
+    # Auth tokens and WebAuthn challenges must be shared by all workers
+    redis_client = get_redis()
+    if redis_client is not None:
+        try:
+            redis_client.ping()
+            logger.info("Redis state store reachable")
+        except Exception as e:
+            logger.error(f"Redis state store not reachable: {e}")
+            raise
+        try:
+            policy = redis_client.config_get('maxmemory-policy').get('maxmemory-policy')
+            if policy != 'noeviction':
+                logger.warning(
+                    f"Redis state store uses maxmemory-policy {policy}; "
+                    "auth tokens may be evicted, use noeviction"
+                )
+        except Exception:
+            pass  # CONFIG is often disabled on managed Redis
+    elif config.api_workers > 1:
+        raise RuntimeError(
+            f"REDIS_URL must be set when running {config.api_workers} workers; "
+            "in-process auth state is not shared between workers"
+        )
+    
     yield
     
     # Shutdown
     logger.info("Shutting down download server...")
     close_connection_pool()
     logger.info("Database connection pool closed")
+    await close_read_pool()
+    close_redis()
 
 
 # Create FastAPI app
 app = FastAPI(
     title=config.api_title,
     version=config.api_version,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -76,11 +109,15 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     try:
-        # Test database connection
-        pool = get_connection_pool()
-        conn = pool.getconn()
-        conn.close()
-        pool.putconn(conn)
+        # Test database connection without closing the pooled socket
+        conn = get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+        finally:
+            return_db_connection(conn)
         
         return {
             "status": "healthy",
@@ -101,5 +138,9 @@ if __name__ == "__main__":
         "server.main:app",
         host=config.api_host,
         port=config.api_port,
-        reload=True
+        workers=1 if config.api_reload else config.api_workers,
+        reload=config.api_reload,
+        # uvloop when installed (not on Windows), asyncio otherwise
+        loop="auto",
+        http="httptools"
     )
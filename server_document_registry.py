@@ -1,17 +1,145 @@
 """
 Helper module for registering documents on server after download
 """
+import atexit
 import logging
-from typing import Optional, Dict, Any
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Tuple
 from client.api_client import DownloadServerClient
 
 logger = logging.getLogger(__name__)
 
-# Global API client (set by downloader_client.py when processing tasks from server)
-_global_api_client: Optional[DownloadServerClient] = None
-_global_task_id: Optional[str] = None
-_global_search_params: Optional[Dict[str, Any]] = None
-_global_client_id: Optional[str] = None
+# Registrations are buffered and sent in batches of up to this many documents,
+# or after this many seconds, whichever comes first
+REGISTRATION_BATCH_SIZE = 100
+REGISTRATION_FLUSH_INTERVAL = 2.0
+
+# Server context (set by downloader_client.py when processing tasks from server).
+# ContextVars keep each asyncio task / thread isolated, so concurrent tasks in
+# one process never register documents under each other's task_id.
+_api_client: ContextVar[Optional[DownloadServerClient]] = ContextVar("api_client", default=None)
+_task_id: ContextVar[Optional[str]] = ContextVar("task_id", default=None)
+_search_params: ContextVar[Optional[Dict[str, Any]]] = ContextVar("search_params", default=None)
+_client_id: ContextVar[Optional[str]] = ContextVar("client_id", default=None)
+
+
+# Pending (api_client, document) registrations, drained by a background thread
+_registration_queue: "queue.Queue" = queue.Queue()
+_flusher_thread: Optional[threading.Thread] = None
+_flusher_lock = threading.Lock()
+_FLUSH = object()  # Queue marker: send the current batch immediately
+
+# Pending (api_client, notification) download-start notifications. There is no
+# bulk endpoint for these, so a single thread sends them one by one off the
+# downloader's path.
+_notification_queue: "queue.Queue" = queue.Queue()
+_notifier_thread: Optional[threading.Thread] = None
+
+
+def _ensure_flusher():
+    """Start the background registration flusher thread once"""
+    global _flusher_thread
+    with _flusher_lock:
+        if _flusher_thread is None or not _flusher_thread.is_alive():
+            _flusher_thread = threading.Thread(
+                target=_registration_flusher,
+                name="document-registration-flusher",
+                daemon=True
+            )
+            _flusher_thread.start()
+
+
+def _send_registration_batch(batch: List[Tuple[DownloadServerClient, Dict[str, Any]]]):
+    """Send buffered registrations, one bulk request per API client"""
+    by_client: Dict[int, Tuple[DownloadServerClient, List[Dict[str, Any]]]] = {}
+    for api_client, document in batch:
+        by_client.setdefault(id(api_client), (api_client, []))[1].append(document)
+    
+    for api_client, documents in by_client.values():
+        try:
+            result = api_client.register_documents_bulk(documents)
+            if result is None:
+                logger.warning(f"Failed to register {len(documents)} documents on server")
+            elif result.get('failed'):
+                logger.warning(f"Server failed to register {result['failed']} of {len(documents)} documents")
+        except Exception as e:
+            logger.error(f"Error registering documents on server: {e}", exc_info=True)
+
+
+def _ensure_notifier():
+    """Start the background download-start notifier thread once"""
+    global _notifier_thread
+    with _flusher_lock:
+        if _notifier_thread is None or not _notifier_thread.is_alive():
+            _notifier_thread = threading.Thread(
+                target=_download_start_notifier,
+                name="document-download-start-notifier",
+                daemon=True
+            )
+            _notifier_thread.start()
+
+
+def _download_start_notifier():
+    """Send queued download-start notifications and log the returned stats"""
+    while True:
+        api_client, notification = _notification_queue.get()
+        try:
+            result = api_client.notify_document_download_start(**notification)
+            if result and result.get('statistics'):
+                stats = result['statistics']
+                logger.debug(
+                    f"Document {notification['document_id']} download start notified. "
+                    f"Speed: {stats.get('download_speed_docs_per_second') or 0:.2f} docs/s, "
+                    f"ETA: {stats.get('estimated_time_remaining_seconds') or 0:.0f}s"
+                )
+        except Exception as e:
+            logger.warning(f"Error notifying document download start: {e}")
+        finally:
+            _notification_queue.task_done()
+
+
+def _registration_flusher():
+    """Drain the registration queue in batches until the process exits"""
+    while True:
+        batch = []
+        item = _registration_queue.get()
+        deadline = time.monotonic() + REGISTRATION_FLUSH_INTERVAL
+        markers = 1
+        
+        while item is not _FLUSH:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= REGISTRATION_BATCH_SIZE or remaining <= 0:
+                break
+            try:
+                item = _registration_queue.get(timeout=remaining)
+                markers += 1
+            except queue.Empty:
+                break
+        
+        try:
+            if batch:
+                _send_registration_batch(batch)
+        finally:
+            for _ in range(markers):
+                _registration_queue.task_done()
+
+
+def flush_document_registrations():
+    """Send all buffered notifications and registrations now and wait until they are done"""
+    # Download starts go out first so the server sees them before registrations
+    _notification_queue.join()
+    if _registration_queue.unfinished_tasks == 0:
+        return
+    _ensure_flusher()
+    _registration_queue.put(_FLUSH)
+    _registration_queue.join()
+
+
+atexit.register(flush_document_registrations)
 
 
 def set_server_context(
@@ -28,23 +156,31 @@ def set_server_context(
         task_id: Current task ID
         search_params: Search parameters used
         client_id: Client ID (will be extracted from api_client if not provided)
+    
+    Passing api_client=None clears the context (call this when a task
+    finishes). This never blocks; buffered registrations keep going out in
+    the background, so call flush_document_registrations() (off the event
+    loop, e.g. via asyncio.to_thread) to wait for them.
     """
-    global _global_api_client, _global_task_id, _global_search_params, _global_client_id
-    _global_api_client = api_client
-    _global_task_id = task_id
-    _global_search_params = search_params
+    _api_client.set(api_client)
+    _task_id.set(task_id)
+    _search_params.set(search_params)
     # Extract client_id from api_client if available
     if not client_id and api_client and hasattr(api_client, 'client_id'):
-        _global_client_id = api_client.client_id
+        _client_id.set(api_client.client_id)
     else:
-        _global_client_id = client_id
+        _client_id.set(client_id)
 
 
 def register_document_on_server(
     metadata: Dict[str, Any]
-) -> Optional[Dict[str, Any]]:
+) -> bool:
     """
-    Register document on server if server context is available
+    Queue document registration on server if server context is available
+    
+    Registrations are buffered and sent in batches by a background thread;
+    call flush_document_registrations() to push out whatever is still
+    pending.
     
     Args:
         metadata: Document metadata dictionary with fields:
@@ -60,13 +196,13 @@ def register_document_on_server(
             - case_number: Case number
     
     Returns:
-        Response dict with system_id and classification, or None if not registered
+        True if the document was queued for registration, False otherwise
     """
-    global _global_api_client, _global_task_id, _global_search_params, _global_client_id
+    api_client = _api_client.get()
     
-    if not _global_api_client:
+    if not api_client:
         # Not in server mode, skip registration
-        return None
+        return False
     
     try:
         # Prepare metadata for API
@@ -86,61 +222,51 @@ def register_document_on_server(
         # Remove None values
         api_metadata = {k: v for k, v in api_metadata.items() if v is not None}
         
-        result = _global_api_client.register_document(
-            metadata=api_metadata,
-            task_id=_global_task_id,
-            search_params=_global_search_params
-        )
-        
-        if result:
-            logger.info(f"Document registered on server: system_id={result.get('system_id')}, client_id={_global_client_id}")
-            return result
-        else:
-            logger.warning("Failed to register document on server")
-            return None
+        # Task context is captured now; the flusher thread does not see ContextVars
+        _registration_queue.put((api_client, {
+            'metadata': api_metadata,
+            'task_id': _task_id.get(),
+            'search_params': _search_params.get()
+        }))
+        _ensure_flusher()
+        logger.debug(f"Document queued for server registration: {api_metadata.get('external_id')}, client_id={_client_id.get()}")
+        return True
             
     except Exception as e:
-        logger.error(f"Error registering document on server: {e}", exc_info=True)
-        return None
+        logger.error(f"Error queueing document registration: {e}", exc_info=True)
+        return False
 
 
 def notify_document_download_start(
     document_id: str,
     reg_number: Optional[str] = None
-) -> Optional[Dict[str, Any]]:
+) -> bool:
     """
     Notify server that a document download has started.
     Server will track this to calculate download speed and ETA.
     
+    The notification is sent by a background thread, so the downloader never
+    waits on the server; the returned statistics are only logged there.
+    
     Args:
         document_id: Document ID being downloaded
         reg_number: Optional registration number
     
     Returns:
-        Response dict with statistics, or None on error
+        True if the notification was queued, False otherwise
     """
-    global _global_api_client, _global_task_id
+    api_client = _api_client.get()
+    task_id = _task_id.get()
     
-    if not _global_api_client or not _global_task_id:
+    if not api_client or not task_id:
         # Not in distributed mode, skip notification
-        return None
+        return False
     
-    try:
-        result = _global_api_client.notify_document_download_start(
-            task_id=_global_task_id,
-            document_id=document_id,
-            reg_number=reg_number
-        )
-        
-        if result and result.get('statistics'):
-            stats = result['statistics']
-            logger.debug(
-                f"Document {document_id} download start notified. "
-                f"Speed: {stats.get('download_speed_docs_per_second', 'N/A'):.2f} docs/s, "
-                f"ETA: {stats.get('estimated_time_remaining_seconds', 'N/A'):.0f}s"
-            )
-        
-        return result
-    except Exception as e:
-        logger.warning(f"Error notifying document download start: {e}")
-        return None
+    # Task context is captured now; the notifier thread does not see ContextVars
+    _notification_queue.put((api_client, {
+        'task_id': task_id,
+        'document_id': document_id,
+        'reg_number': reg_number
+    }))
+    _ensure_notifier()
+    return True
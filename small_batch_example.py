@@ -6,12 +6,13 @@ Start with 3-5 requests, then gradually increase.
 """
 
 import asyncio
-import json
+import aiofiles
+import orjson
 from datetime import datetime
 from pathlib import Path
-from bulk_requests_playwright import PlaywrightBulkHandler, PlaywrightConfig
+from bulk_requests_playwright import PlaywrightBulkHandler, PlaywrightConfig, launch_browser
 import logging
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +20,238 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of searches run at the same time (each on its own browser context)
+MAX_PARALLEL = 3
+# Documents taken from each search's results (kept small for testing)
+DOCS_PER_QUERY = 3
+# Documents processed at the same time across the whole batch (each on its own context)
+MAX_PARALLEL_DOCS = 3
+
+# Remaining queries are skipped after this many CAPTCHA hits in one batch
+CAPTCHA_STRIKE_LIMIT = 2
+
+
+def _dumps(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON (non-JSON values such as Path become strings)"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str)
+
+
+async def _process_doc(
+    search_handler: PlaywrightBulkHandler,
+    semaphore: asyncio.Semaphore,
+    doc_link: Dict,
+    doc_idx: int,
+    total_docs: int,
+    documents_dir: Path
+) -> Tuple[bool, int]:
+    """
+    Download one document and screenshot its pages on a separate context
+    of the search handler's browser, paced by the search handler's rate limiter
+    
+    Returns:
+        Tuple of (downloaded, number of page screenshots)
+    """
+    async with semaphore:
+        handler = PlaywrightBulkHandler(
+            config=search_handler.config,
+            browser=search_handler.browser,
+            rate_limiter=search_handler.rate_limiter
+        )
+        try:
+            doc_id = doc_link['id']
+            reg_number = doc_link['reg_number']
+            
+            logger.info("      [%s/%s] Processing %s...", doc_idx, total_docs, reg_number)
+            
+            # download_document and screenshot_document_pages expect an open page
+            await handler._init_browser()
+            
+            # Download HTML
+            doc_filename = f"{doc_id}_{reg_number}.html"
+            doc_path = documents_dir / doc_filename
+            
+            downloaded_path = await handler.download_document(
+                doc_link['url'],
+                str(doc_path)
+            )
+            
+            # Take screenshots of all pages
+            logger.info("        Taking screenshots of all pages...")
+            screenshot_paths = await handler.screenshot_document_pages(
+                doc_link['url'],
+                str(documents_dir),
+                doc_id,
+                page_height=1000,  # Height of each page screenshot
+                overlap=100  # Overlap to avoid cutting content
+            )
+            
+            if screenshot_paths:
+                logger.info("        ✓ Captured %s page screenshot(s)", len(screenshot_paths))
+            
+            return bool(downloaded_path), len(screenshot_paths)
+            
+        except Exception as e:
+            logger.warning("      Failed to process %s: %s", doc_link.get('reg_number', 'unknown'), e)
+            return False, 0
+        finally:
+            await handler.close()
+
+
+async def _process_query(
+    handler_pool: asyncio.Queue,
+    query: Dict,
+    i: int,
+    total: int,
+    output_dir: Path,
+    timestamp: str,
+    documents_dir: Path,
+    batch_state: Dict,
+    doc_semaphore: asyncio.Semaphore
+) -> Dict:
+    """
+    Run one search on a handler borrowed from the pool and save its results
+    
+    documents_dir must already exist; it is created up front for every
+    query so parallel workers never race on mkdir. batch_state is shared by
+    all queries of the batch and counts CAPTCHA hits ('captcha_strikes');
+    doc_semaphore caps the batch's open document contexts.
+    
+    Returns:
+        Summary dictionary for this query
+    """
+    query_name = query.pop('name', f'Query_{i}')
+    handler = await handler_pool.get()
+    skipped = {
+        'query_number': i,
+        'name': query_name,
+        'status': 'skipped_captcha',
+        'success': False
+    }
+    
+    def below_captcha_wall() -> bool:
+        return batch_state['captcha_strikes'] < CAPTCHA_STRIKE_LIMIT
+    
+    try:
+        # Once the site has put up a CAPTCHA wall, further searches only burn time
+        if not below_captcha_wall():
+            logger.warning("[%s/%s] Skipping %s: CAPTCHA wall reached", i, total, query_name)
+            return skipped
+        
+        logger.info("[%s/%s] Processing: %s", i, total, query_name)
+        logger.info("  Parameters: %s", query)
+        
+        # Perform search; strikes are checked again after the shared
+        # rate-limiter waits, since other queries may hit the wall meanwhile
+        page = await handler.search(query, wait_for_results=True, before_submit=below_captcha_wall)
+        
+        if not page and not below_captcha_wall():
+            logger.warning("[%s/%s] Skipping %s: CAPTCHA wall reached", i, total, query_name)
+            return skipped
+        
+        if not page:
+            logger.error("  ✗ Search failed for query %s", i)
+            return {
+                'query_number': i,
+                'name': query_name,
+                'status': 'failed',
+                'success': False
+            }
+        
+        # Result count, CAPTCHA modal and document links in one page round-trip
+        summary = await handler.extract_search_summary(max_links=DOCS_PER_QUERY) or {}
+        
+        # Check for CAPTCHA: the summary already saw the modal; the full check
+        # (selectors plus a body-text scan) only runs when no results came back
+        has_captcha = summary.get('has_captcha') or (
+            not summary.get('has_results') and await handler.check_for_captcha()
+        )
+        if has_captcha:
+            batch_state['captcha_strikes'] += 1
+            logger.warning("  ⚠️  CAPTCHA detected for query %s", i)
+            if batch_state['captcha_strikes'] == CAPTCHA_STRIKE_LIMIT:
+                logger.error("CAPTCHA wall - skipping the remaining queries of this batch")
+            return {
+                'query_number': i,
+                'name': query_name,
+                'status': 'captcha_detected',
+                'success': False
+            }
+        
+        has_results = summary.get('has_results', False)
+        documents_found = summary.get('document_count')
+        document_links = summary.get('links', [])
+        
+        # Fetch the HTML and take the screenshot concurrently; both only read the page
+        result_file = output_dir / f"{timestamp}_query_{i}_{query_name.replace(' ', '_')}.html"
+        screenshot_file = output_dir / f"{timestamp}_query_{i}_screenshot.jpg"
+        async with asyncio.TaskGroup() as tg:
+            content_task = tg.create_task(handler.get_page_content())
+            tg.create_task(handler.take_screenshot(str(screenshot_file)))
+        content = content_task.result()
+        content_length = len(content)
+        
+        # Save results
+        async with aiofiles.open(result_file, 'w', encoding='utf-8') as f:
+            await f.write(content)
+        
+        logger.info("    Found %s document links", len(document_links))
+        
+        logger.info("  ✓ Success!")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("    Content length: %s bytes", format(content_length, ','))
+        logger.info("    Saved to: %s", result_file.name)
+        logger.info("    Screenshot: %s", screenshot_file.name)
+        logger.info("    Appears to have results: %s", has_results)
+        if documents_found is not None:
+            logger.info("    Documents found: %s", documents_found)
+        logger.info("    Document links found: %s", len(document_links))
+        
+        # Download documents and take screenshots if requested
+        downloaded_count = 0
+        screenshots_count = 0
+        if document_links and len(document_links) > 0:
+            logger.info("    Processing documents...")
+            doc_results = await asyncio.gather(*[
+                _process_doc(handler, doc_semaphore, doc_link, doc_idx, len(document_links), documents_dir)
+                for doc_idx, doc_link in enumerate(document_links, 1)
+            ])
+            downloaded_count = sum(1 for downloaded, _ in doc_results if downloaded)
+            screenshots_count = sum(screenshots for _, screenshots in doc_results)
+            
+            # Metadata of all processed documents goes into one JSON Lines file
+            async with aiofiles.open(documents_dir / "metadata.jsonl", 'wb') as f:
+                await f.write(b"".join(orjson.dumps(doc_link, default=str) + b"\n" for doc_link in document_links))
+            
+            if downloaded_count > 0 or screenshots_count > 0:
+                logger.info("    ✓ Processed %s documents, %s page screenshots", downloaded_count, screenshots_count)
+        
+        return {
+            'query_number': i,
+            'name': query_name,
+            'status': 'success',
+            'success': True,
+            'content_length': content_length,
+            'has_results': has_results,
+            'documents_found': documents_found,
+            'file': str(result_file),
+            'screenshot': str(screenshot_file),
+            'document_links_found': len(document_links),
+            'documents_downloaded': downloaded_count,
+            'page_screenshots': screenshots_count
+        }
+        
+    except Exception as e:
+        logger.error("  ✗ Error processing query %s: %s", i, e)
+        return {
+            'query_number': i,
+            'name': query_name,
+            'status': 'error',
+            'success': False,
+            'error': str(e)
+        }
+    finally:
+        handler_pool.put_nowait(handler)
+
 
 async def small_batch_search():
     """
@@ -35,12 +268,13 @@ async def small_batch_search():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # Configuration - conservative settings for small batches
-    handler = PlaywrightBulkHandler(
-        config=PlaywrightConfig(
-            headless=True,
-            delay_between_requests=4.0,  # 4 seconds between requests (conservative)
-            timeout=30000
-        )
+    # (all handlers of the batch share one rate limiter, so the delay spaces
+    # every request to the site, not just each handler's own)
+    config = PlaywrightConfig(
+        headless=True,
+        delay_between_requests=4.0,  # 4 seconds between requests (conservative)
+        timeout=30000,
+        screenshot_full_page=False  # Viewport JPEGs are enough to eyeball a batch
     )
     
     # Define a small batch of search queries
@@ -63,162 +297,51 @@ async def small_batch_search():
         },
     ]
     
-    results_summary = []
+    # Per-query document directories are created once, before any worker starts
+    documents_dirs = [
+        output_dir / f"{timestamp}_query_{i}_documents"
+        for i in range(1, len(search_queries) + 1)
+    ]
+    for documents_dir in documents_dirs:
+        documents_dir.mkdir(exist_ok=True)
+    
+    batch_state = {'captcha_strikes': 0}
+    doc_semaphore = asyncio.Semaphore(MAX_PARALLEL_DOCS)
+    
+    # One browser, one context per parallel search; the pool size caps concurrency
+    playwright, browser = await launch_browser(config)
+    handlers = [PlaywrightBulkHandler(config=config, browser=browser)]
+    handlers += [
+        PlaywrightBulkHandler(config=config, browser=browser, rate_limiter=handlers[0].rate_limiter)
+        for _ in range(min(MAX_PARALLEL, len(search_queries)) - 1)
+    ]
+    handler_pool: asyncio.Queue = asyncio.Queue()
+    for handler in handlers:
+        handler_pool.put_nowait(handler)
     
     try:
-        logger.info(f"Starting batch of {len(search_queries)} searches...")
+        logger.info(f"Starting batch of {len(search_queries)} searches ({len(handlers)} in parallel)...")
         logger.info(f"Results will be saved to: {output_dir}/")
         logger.info("")
         
-        for i, query in enumerate(search_queries, 1):
-            query_name = query.pop('name', f'Query_{i}')
-            logger.info(f"[{i}/{len(search_queries)}] Processing: {query_name}")
-            logger.info(f"  Parameters: {query}")
-            
-            try:
-                # Perform search
-                page = await handler.search(query, wait_for_results=True)
-                
-                if page:
-                    # Check for CAPTCHA
-                    has_captcha = await handler.check_for_captcha()
-                    if has_captcha:
-                        logger.warning(f"  ⚠️  CAPTCHA detected for query {i}")
-                        results_summary.append({
-                            'query_number': i,
-                            'name': query_name,
-                            'status': 'captcha_detected',
-                            'success': False
-                        })
-                        continue
-                    
-                    # Get content
-                    content = await handler.get_page_content()
-                    text_content = await handler.get_page_text()
-                    
-                    # Save results
-                    result_file = output_dir / f"{timestamp}_query_{i}_{query_name.replace(' ', '_')}.html"
-                    with open(result_file, 'w', encoding='utf-8') as f:
-                        f.write(content)
-                    
-                    # Take screenshot
-                    screenshot_file = output_dir / f"{timestamp}_query_{i}_screenshot.png"
-                    await handler.take_screenshot(str(screenshot_file))
-                    
-                    # Extract basic info
-                    content_length = len(content)
-                    has_results = 'результат' in text_content.lower() if text_content else False
-                    
-                    # Extract document links
-                    document_links = await handler.extract_document_links(max_links=10)  # Limit to 10 for testing
-                    logger.info(f"    Found {len(document_links)} document links")
-                    
-                    logger.info(f"  ✓ Success!")
-                    logger.info(f"    Content length: {content_length:,} bytes")
-                    logger.info(f"    Saved to: {result_file.name}")
-                    logger.info(f"    Screenshot: {screenshot_file.name}")
-                    logger.info(f"    Appears to have results: {has_results}")
-                    logger.info(f"    Document links found: {len(document_links)}")
-                    
-                    # Download documents and take screenshots if requested
-                    downloaded_count = 0
-                    screenshots_count = 0
-                    if document_links and len(document_links) > 0:
-                        logger.info(f"    Processing documents...")
-                        documents_dir = output_dir / f"{timestamp}_query_{i}_documents"
-                        documents_dir.mkdir(exist_ok=True)
-                        
-                        for doc_idx, doc_link in enumerate(document_links[:3], 1):  # Limit to 3 for testing
-                            try:
-                                doc_id = doc_link['id']
-                                reg_number = doc_link['reg_number']
-                                
-                                logger.info(f"      [{doc_idx}/{min(3, len(document_links))}] Processing {reg_number}...")
-                                
-                                # Download HTML
-                                doc_filename = f"{doc_id}_{reg_number}.html"
-                                doc_path = documents_dir / doc_filename
-                                
-                                downloaded_path = await handler.download_document(
-                                    doc_link['url'],
-                                    str(doc_path)
-                                )
-                                
-                                if downloaded_path:
-                                    downloaded_count += 1
-                                
-                                # Take screenshots of all pages
-                                logger.info(f"        Taking screenshots of all pages...")
-                                screenshot_paths = await handler.screenshot_document_pages(
-                                    doc_link['url'],
-                                    str(documents_dir),
-                                    doc_id,
-                                    page_height=1000,  # Height of each page screenshot
-                                    overlap=100  # Overlap to avoid cutting content
-                                )
-                                
-                                if screenshot_paths:
-                                    screenshots_count += len(screenshot_paths)
-                                    logger.info(f"        ✓ Captured {len(screenshot_paths)} page screenshot(s)")
-                                
-                                # Save document metadata
-                                metadata_file = documents_dir / f"{doc_id}_metadata.json"
-                                with open(metadata_file, 'w', encoding='utf-8') as f:
-                                    json.dump(doc_link, f, indent=2, ensure_ascii=False)
-                                
-                            except Exception as e:
-                                logger.warning(f"      Failed to process {doc_link.get('reg_number', 'unknown')}: {e}")
-                        
-                        if downloaded_count > 0 or screenshots_count > 0:
-                            logger.info(f"    ✓ Processed {downloaded_count} documents, {screenshots_count} page screenshots")
-                    
-                    results_summary.append({
-                        'query_number': i,
-                        'name': query_name,
-                        'status': 'success',
-                        'success': True,
-                        'content_length': content_length,
-                        'has_results': has_results,
-                        'file': str(result_file),
-                        'screenshot': str(screenshot_file),
-                        'document_links_found': len(document_links),
-                        'documents_downloaded': downloaded_count,
-                        'page_screenshots': screenshots_count
-                    })
-                else:
-                    logger.error(f"  ✗ Search failed for query {i}")
-                    results_summary.append({
-                        'query_number': i,
-                        'name': query_name,
-                        'status': 'failed',
-                        'success': False
-                    })
-                    
-            except Exception as e:
-                logger.error(f"  ✗ Error processing query {i}: {e}")
-                results_summary.append({
-                    'query_number': i,
-                    'name': query_name,
-                    'status': 'error',
-                    'success': False,
-                    'error': str(e)
-                })
-            
-            # Small delay between queries (in addition to rate limiting)
-            if i < len(search_queries):
-                logger.info("  Waiting before next query...")
-                await asyncio.sleep(1)
+        results_summary = await asyncio.gather(*[
+            _process_query(
+                handler_pool, query, i, len(search_queries), output_dir, timestamp,
+                documents_dir, batch_state, doc_semaphore
+            )
+            for i, (query, documents_dir) in enumerate(zip(search_queries, documents_dirs), 1)
+        ])
         
         # Save summary
         summary_file = output_dir / f"{timestamp}_summary.json"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            json.dump({
+        async with aiofiles.open(summary_file, 'wb') as f:
+            await f.write(_dumps({
                 'timestamp': timestamp,
                 'total_queries': len(search_queries),
                 'successful': sum(1 for r in results_summary if r.get('success')),
                 'failed': sum(1 for r in results_summary if not r.get('success')),
                 'results': results_summary
-            }, f, indent=2, ensure_ascii=False)
+            }))
         
         # Print summary
         logger.info("")
@@ -240,7 +363,10 @@ async def small_batch_search():
     except Exception as e:
         logger.error(f"Batch processing error: {e}", exc_info=True)
     finally:
-        await handler.close()
+        for handler in handlers:
+            await handler.close()
+        await browser.close()
+        await playwright.stop()
 
 
 async def single_search_example():
@@ -279,8 +405,8 @@ async def single_search_example():
             
             # Save result
             content = await handler.get_page_content()
-            with open("single_search_result.html", "w", encoding="utf-8") as f:
-                f.write(content)
+            async with aiofiles.open("single_search_result.html", "w", encoding="utf-8") as f:
+                await f.write(content)
             logger.info("✓ Result saved to single_search_result.html")
             
             # Screenshot
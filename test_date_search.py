@@ -3,13 +3,20 @@ Test script to search with RegDateBegin date field
 """
 
 import asyncio
-from bulk_requests_playwright import PlaywrightBulkHandler, PlaywrightConfig
+import re
+import aiofiles
+from bulk_requests_playwright import PlaywrightBulkHandler, PlaywrightConfig, SUBMIT_BUTTON_SELECTOR, RESULTS_READY_SELECTOR
 from rich.console import Console
 from rich.panel import Panel
 from rich import box
 
 console = Console()
 
+# Result count in the "знайдено документів: N" banner
+_DOC_COUNT_RE = re.compile(r'знайдено документів:\s*(\d+)')
+# Case-insensitive CAPTCHA markers (no lowercased copy of the page is built)
+_CAPTCHA_RE = re.compile(r'captcha|капча', re.IGNORECASE)
+
 
 async def test_date_search():
     """
@@ -67,24 +74,14 @@ async def test_date_search():
                 submitted = False
                 
                 # Method 1: Try to find and click submit button
-                submit_selectors = [
-                    'input[type="submit"]',
-                    'button[type="submit"]',
-                    'input[value*="Пошук"]',
-                    'button:has-text("Пошук")'
-                ]
-                
-                for selector in submit_selectors:
-                    try:
-                        submit_button = page.locator(selector).first()
-                        count = await submit_button.count()
-                        if count > 0:
-                            await submit_button.click()
-                            console.print(f"[green]✓[/green] Clicked search button ({selector})")
-                            submitted = True
-                            break
-                    except:
-                        continue
+                try:
+                    submit_button = page.locator(SUBMIT_BUTTON_SELECTOR).first
+                    if await submit_button.count() > 0:
+                        await submit_button.click()
+                        console.print("[green]✓[/green] Clicked search button")
+                        submitted = True
+                except:
+                    pass
                 
                 # Method 2: If no button found, try pressing Enter on the date field
                 if not submitted:
@@ -92,9 +89,11 @@ async def test_date_search():
                     console.print("[green]✓[/green] Submitted form (Enter key)")
                     submitted = True
                 
-                # Wait for results to load
-                await page.wait_for_load_state('networkidle', timeout=15000)
-                await asyncio.sleep(2)
+                # Wait for the result count (or a CAPTCHA) instead of a fixed delay
+                try:
+                    await page.wait_for_selector(RESULTS_READY_SELECTOR, state='visible', timeout=15000)
+                except Exception:
+                    await page.wait_for_load_state('networkidle', timeout=15000)
                 
             except Exception as e:
                 console.print(f"[bold red]✗ Error submitting form: {e}[/bold red]")
@@ -103,9 +102,6 @@ async def test_date_search():
         # Check for the expected result message
         with console.status("[bold green]Checking results...", spinner="dots"):
             try:
-                # Wait for the results message to appear
-                await asyncio.sleep(2)
-                
                 # Look for the span with the document count
                 # The message format: "За заданими параметрами пошуку знайдено документів: 11684"
                 page_content = await page.content()
@@ -120,8 +116,7 @@ async def test_date_search():
                     if count > 0:
                         result_text = await result_span.first.inner_text()
                         # Extract the number from the text
-                        import re
-                        match = re.search(r'знайдено документів:\s*(\d+)', result_text)
+                        match = _DOC_COUNT_RE.search(result_text)
                         if match:
                             document_count = int(match.group(1))
                 except:
@@ -147,7 +142,7 @@ async def test_date_search():
                     console.print(f"[dim]Result message: {result_text}[/dim]")
                     
                     # Check for CAPTCHA
-                    if 'captcha' in page_content.lower() or 'капча' in page_content.lower():
+                    if _CAPTCHA_RE.search(page_content):
                         console.print("[bold yellow]⚠ CAPTCHA detected - this may affect results[/bold yellow]")
                     
                     # Take a screenshot anyway
@@ -161,12 +156,12 @@ async def test_date_search():
                     console.print("[yellow]⚠ No result message found[/yellow]")
                     
                     # Check for CAPTCHA
-                    if 'captcha' in page_content.lower() or 'капча' in page_content.lower():
+                    if _CAPTCHA_RE.search(page_content):
                         console.print("[bold red]⚠ CAPTCHA detected![/bold red]")
                     
                     # Save page content for debugging
-                    with open("test_date_search_page.html", "w", encoding="utf-8") as f:
-                        f.write(page_content)
+                    async with aiofiles.open("test_date_search_page.html", "w", encoding="utf-8") as f:
+                        await f.write(page_content)
                     console.print("[dim]Page content saved to: test_date_search_page.html[/dim]")
                     
                     return False
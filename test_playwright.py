@@ -3,8 +3,12 @@ Test script using Playwright with headless browser
 """
 
 import asyncio
+import aiofiles
+import re
 import sys
-from bulk_requests_playwright import PlaywrightBulkHandler, PlaywrightConfig
+from typing import Optional
+from playwright.async_api import Browser
+from bulk_requests_playwright import PlaywrightBulkHandler, PlaywrightConfig, launch_browser
 import logging
 
 logging.basicConfig(
@@ -13,8 +17,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Case-insensitive result markers (no lowercased copy of the page text is built)
+_HAS_RESULTS_RE = re.compile(r'результат|знайдено', re.IGNORECASE)
 
-async def test_basic_navigation():
+
+async def test_basic_navigation(browser: Optional[Browser] = None):
     """Test 1: Basic navigation"""
     logger.info("=" * 60)
     logger.info("TEST 1: Basic Navigation with Playwright")
@@ -24,7 +31,8 @@ async def test_basic_navigation():
         config=PlaywrightConfig(
             headless=True,
             delay_between_requests=2.0
-        )
+        ),
+        browser=browser
     )
     
     try:
@@ -32,12 +40,12 @@ async def test_basic_navigation():
         page = await handler.navigate("/")
         
         if page:
-            logger.info(f"✓ Navigation successful")
-            logger.info(f"  URL: {page.url}")
+            logger.info("✓ Navigation successful")
+            logger.info("  URL: %s", page.url)
             
             # Get page title
             title = await page.title()
-            logger.info(f"  Title: {title}")
+            logger.info("  Title: %s", title)
             
             # Check for CAPTCHA
             has_captcha = await handler.check_for_captcha()
@@ -53,8 +61,8 @@ async def test_basic_navigation():
             # Save HTML
             content = await handler.get_page_content()
             if content:
-                with open("test_playwright_homepage.html", "w", encoding="utf-8") as f:
-                    f.write(content)
+                async with aiofiles.open("test_playwright_homepage.html", "w", encoding="utf-8") as f:
+                    await f.write(content)
                 logger.info("  HTML saved to test_playwright_homepage.html")
             
             return True
@@ -63,13 +71,13 @@ async def test_basic_navigation():
             return False
             
     except Exception as e:
-        logger.error(f"Error: {e}", exc_info=True)
+        logger.error("Error: %s", e, exc_info=True)
         return False
     finally:
         await handler.close()
 
 
-async def test_search():
+async def test_search(browser: Optional[Browser] = None):
     """Test 2: Search functionality"""
     logger.info("\n" + "=" * 60)
     logger.info("TEST 2: Search with Playwright")
@@ -79,7 +87,8 @@ async def test_search():
         config=PlaywrightConfig(
             headless=True,
             delay_between_requests=3.0
-        )
+        ),
+        browser=browser
     )
     
     try:
@@ -89,12 +98,12 @@ async def test_search():
             'INSType': '1',  # Перша
         }
         
-        logger.info(f"Search parameters: {search_params}")
+        logger.info("Search parameters: %s", search_params)
         page = await handler.search(search_params, wait_for_results=True)
         
         if page:
-            logger.info(f"✓ Search completed")
-            logger.info(f"  URL: {page.url}")
+            logger.info("✓ Search completed")
+            logger.info("  URL: %s", page.url)
             
             # Check for CAPTCHA
             has_captcha = await handler.check_for_captcha()
@@ -108,8 +117,8 @@ async def test_search():
             # Save HTML
             content = await handler.get_page_content()
             if content:
-                with open("test_playwright_search.html", "w", encoding="utf-8") as f:
-                    f.write(content)
+                async with aiofiles.open("test_playwright_search.html", "w", encoding="utf-8") as f:
+                    await f.write(content)
                 logger.info("  HTML saved to test_playwright_search.html")
             
             # Try to find results table or content
@@ -117,10 +126,10 @@ async def test_search():
                 # Look for common result indicators
                 text_content = await handler.get_page_text()
                 if text_content:
-                    if 'результат' in text_content.lower() or 'знайдено' in text_content.lower():
+                    if _HAS_RESULTS_RE.search(text_content):
                         logger.info("  ℹ️  Response appears to contain results")
             except Exception as e:
-                logger.warning(f"  Could not extract text: {e}")
+                logger.warning("  Could not extract text: %s", e)
             
             return True
         else:
@@ -128,13 +137,13 @@ async def test_search():
             return False
             
     except Exception as e:
-        logger.error(f"Error: {e}", exc_info=True)
+        logger.error("Error: %s", e, exc_info=True)
         return False
     finally:
         await handler.close()
 
 
-async def test_multiple_searches():
+async def test_multiple_searches(browser: Optional[Browser] = None):
     """Test 3: Multiple searches"""
     logger.info("\n" + "=" * 60)
     logger.info("TEST 3: Multiple Searches")
@@ -144,7 +153,8 @@ async def test_multiple_searches():
         config=PlaywrightConfig(
             headless=True,
             delay_between_requests=4.0  # Longer delay for bulk
-        )
+        ),
+        browser=browser
     )
     
     try:
@@ -160,16 +170,16 @@ async def test_multiple_searches():
             },
         ]
         
-        logger.info(f"Executing {len(search_queries)} searches...")
+        logger.info("Executing %s searches...", len(search_queries))
         results = await handler.bulk_search(search_queries, delay_multiplier=1.0)
         
         successful = sum(1 for r in results if r is not None)
-        logger.info(f"\nSummary: {successful}/{len(search_queries)} searches successful")
+        logger.info("\nSummary: %s/%s searches successful", successful, len(search_queries))
         
         return successful == len(search_queries)
         
     except Exception as e:
-        logger.error(f"Error: {e}", exc_info=True)
+        logger.error("Error: %s", e, exc_info=True)
         return False
     finally:
         await handler.close()
@@ -186,24 +196,31 @@ async def main():
         'multiple_searches': False
     }
     
-    # Test 1: Basic navigation
-    results['navigation'] = await test_basic_navigation()
-    
-    if not results['navigation']:
-        logger.error("\n✗ Basic navigation failed. Stopping tests.")
-        return results
-    
-    # Wait a bit
-    await asyncio.sleep(2)
+    # One browser for all tests; each test opens its own context on it
+    playwright, browser = await launch_browser()
     
-    # Test 2: Search
-    results['search'] = await test_search()
-    
-    # Wait a bit
-    await asyncio.sleep(2)
-    
-    # Test 3: Multiple searches
-    results['multiple_searches'] = await test_multiple_searches()
+    try:
+        # Test 1: Basic navigation
+        results['navigation'] = await test_basic_navigation(browser)
+        
+        if not results['navigation']:
+            logger.error("\n✗ Basic navigation failed. Stopping tests.")
+            return results
+        
+        # Wait a bit
+        await asyncio.sleep(2)
+        
+        # Test 2: Search
+        results['search'] = await test_search(browser)
+        
+        # Wait a bit
+        await asyncio.sleep(2)
+        
+        # Test 3: Multiple searches
+        results['multiple_searches'] = await test_multiple_searches(browser)
+    finally:
+        await browser.close()
+        await playwright.stop()
     
     # Final summary
     logger.info("\n" + "=" * 60)
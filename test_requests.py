@@ -3,52 +3,76 @@ Simple test script to make a few requests to reyestr.court.gov.ua
 This helps verify the connection and understand the website's response patterns.
 """
 
+import atexit
+import re
 import sys
-from bulk_requests import BulkRequestHandler, RequestConfig
+import requests
+import lxml.html
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from bulk_requests import BulkRequestHandler, RequestConfig, create_session
 import logging
 
-# Set up logging to see what's happening
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Pages requested by test_multiple_pages: (endpoint, description)
+_PAGES_TO_TEST = (
+    ("/", "Homepage"),
+    ("/Help", "Help page"),
+    ("/Rules", "Rules page"),
+)
+
+# Upper bound on page requests in flight at once
+MAX_PARALLEL_PAGES = len(_PAGES_TO_TEST)
+
+# CAPTCHA-related text, searched in the raw response bytes (Cyrillic matched as
+# the lowercase UTF-8 the page uses)
+_CAPTCHA_HINT_RE = re.compile('суму цифр|арифметичного виразу'.encode('utf-8'))
 
-def test_basic_connection():
-    """Test 1: Basic connection to homepage"""
-    logger.info("=" * 60)
-    logger.info("TEST 1: Basic Connection Test")
-    logger.info("=" * 60)
+# Sample files are written on a background thread so the next request is not
+# held up by disk I/O; the pool is drained at exit
+_IO_POOL = ThreadPoolExecutor(max_workers=1)
+atexit.register(_IO_POOL.shutdown)
+
+
+def _save(path: str, data: bytes):
+    """Write data to path (runs on _IO_POOL)"""
+    try:
+        with open(path, "wb") as f:
+            f.write(data)
+    except Exception as e:
+        logger.error(f"Failed to save {path}: {e}")
+
+
+def _log_block(*lines: str, level: int = logging.INFO):
+    """Log related lines as one record, so they are written in one go and stay together"""
+    logger.log(level, "\n".join(lines))
+
+
+def test_basic_connection(session: Optional[requests.Session] = None):
+    """Test 1: Basic connection to homepage (headers only)"""
+    _log_block("=" * 60, "TEST 1: Basic Connection Test", "=" * 60)
     
     handler = BulkRequestHandler(
-        config=RequestConfig(delay_between_requests=2.0)
+        config=RequestConfig(delay_between_requests=2.0),
+        session=session
     )
     
     try:
-        response = handler.get_page("/")
+        # Reachability only needs status and headers; the body is inspected
+        # by the form inspection test, which downloads the homepage anyway
+        response = handler.head_page("/")
+        if response is None or not response.ok:
+            logger.info("HEAD not answered, falling back to GET")
+            response = handler.get_page("/")
         
         if response:
-            logger.info(f"✓ Success! Status code: {response.status_code}")
-            logger.info(f"  URL: {response.url}")
-            logger.info(f"  Content length: {len(response.text)} bytes")
-            
-            # Check for CAPTCHA (informational only)
-            if handler._has_captcha(response):
-                logger.warning("⚠️  CAPTCHA challenge detected in response")
-                logger.warning("  (This might be a blocking CAPTCHA or just informational)")
-            else:
-                logger.info("✓ No blocking CAPTCHA detected")
-            
-            # Check for CAPTCHA-related text (even if not blocking)
-            content_lower = response.text.lower()
-            if any(word in content_lower for word in ['суму цифр', 'арифметичного виразу']):
-                logger.info("  ℹ️  CAPTCHA-related text found (may be informational)")
-            
-            # Save a sample of the response for inspection
-            with open("test_response_sample.html", "w", encoding="utf-8") as f:
-                f.write(response.text[:10000])  # First 10000 chars
-            logger.info("  Saved sample response to test_response_sample.html")
+            content_length = response.headers.get('Content-Length') or len(response.content)
+            _log_block(
+                f"✓ Success! Status code: {response.status_code}",
+                f"  URL: {response.url}",
+                f"  Content length: {content_length} bytes"
+            )
             
             return True
         else:
@@ -62,44 +86,50 @@ def test_basic_connection():
         handler.close()
 
 
-def test_multiple_pages():
-    """Test 2: Request multiple pages with delays"""
-    logger.info("\n" + "=" * 60)
-    logger.info("TEST 2: Multiple Page Requests")
-    logger.info("=" * 60)
+def _fetch_page(handler: BulkRequestHandler, endpoint: str) -> Optional[requests.Response]:
+    """GET a page, sharing the session's homepage load with the other tests"""
+    if endpoint == "/":
+        return handler.ensure_home()
+    return handler.get_page(endpoint)
+
+
+def test_multiple_pages(session: Optional[requests.Session] = None):
+    """Test 2: Request multiple pages concurrently (rate limited)"""
+    _log_block("\n" + "=" * 60, "TEST 2: Multiple Page Requests", "=" * 60)
     
     handler = BulkRequestHandler(
-        config=RequestConfig(delay_between_requests=3.0)
+        config=RequestConfig(delay_between_requests=3.0),
+        session=session
     )
     
-    pages_to_test = [
-        ("/", "Homepage"),
-        ("/Help", "Help page"),
-        ("/Rules", "Rules page"),
-    ]
-    
     results = []
     
     try:
-        for endpoint, description in pages_to_test:
-            logger.info(f"\nRequesting: {description} ({endpoint})")
-            response = handler.get_page(endpoint)
-            
+        # Pages are independent: overlap their round trips while the handler's
+        # rate limiter still spaces out when each request starts
+        logger.info("\nRequesting %d pages concurrently", len(_PAGES_TO_TEST))
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_PAGES) as executor:
+            responses = list(executor.map(lambda page: _fetch_page(handler, page[0]), _PAGES_TO_TEST))
+        
+        for (endpoint, description), response in zip(_PAGES_TO_TEST, responses):
             if response:
-                logger.info(f"  ✓ Status: {response.status_code}")
-                logger.info(f"  ✓ Length: {len(response.text)} bytes")
+                logger.info(
+                    "\n%s (%s)\n  ✓ Status: %s\n  ✓ Length: %d bytes",
+                    description, endpoint, response.status_code, len(response.content)
+                )
                 
-                if handler._has_captcha(response):
-                    logger.warning(f"  ⚠️  CAPTCHA detected on {description}")
+                has_captcha = handler._has_captcha(response)
+                if has_captcha:
+                    logger.warning("  ⚠️  CAPTCHA detected on %s", description)
                 
                 results.append({
                     'endpoint': endpoint,
                     'status': response.status_code,
                     'success': True,
-                    'has_captcha': handler._has_captcha(response)
+                    'has_captcha': has_captcha
                 })
             else:
-                logger.error(f"  ✗ Failed to get {description}")
+                logger.error("\n%s (%s)\n  ✗ Failed to get %s", description, endpoint, description)
                 results.append({
                     'endpoint': endpoint,
                     'status': None,
@@ -107,13 +137,11 @@ def test_multiple_pages():
                 })
         
         # Summary
-        logger.info("\n" + "-" * 60)
-        logger.info("Summary:")
         successful = sum(1 for r in results if r.get('success'))
-        logger.info(f"  Successful requests: {successful}/{len(results)}")
+        logger.info("\n%s\nSummary:\n  Successful requests: %d/%d", "-" * 60, successful, len(results))
         captcha_count = sum(1 for r in results if r.get('has_captcha'))
         if captcha_count > 0:
-            logger.warning(f"  Pages with CAPTCHA: {captcha_count}")
+            logger.warning("  Pages with CAPTCHA: %d", captcha_count)
         
         return results
         
@@ -124,43 +152,65 @@ def test_multiple_pages():
         handler.close()
 
 
-def test_search_form_inspection():
-    """Test 3: Inspect the search form structure"""
-    logger.info("\n" + "=" * 60)
-    logger.info("TEST 3: Search Form Inspection")
-    logger.info("=" * 60)
+def test_search_form_inspection(session: Optional[requests.Session] = None):
+    """Test 3: Check the homepage for CAPTCHA and inspect the search form structure"""
+    _log_block("\n" + "=" * 60, "TEST 3: Search Form Inspection", "=" * 60)
     
     handler = BulkRequestHandler(
-        config=RequestConfig(delay_between_requests=2.0)
+        config=RequestConfig(delay_between_requests=2.0),
+        session=session
     )
     
     try:
-        response = handler.get_page("/")
+        response = handler.ensure_home()
         
         if response and response.status_code == 200:
-            # Look for form elements in the HTML
-            html = response.text.lower()
+            content = response.content
+            
+            # Check for CAPTCHA (informational only)
+            if handler._has_captcha(response):
+                _log_block(
+                    "⚠️  CAPTCHA challenge detected in response",
+                    "  (This might be a blocking CAPTCHA or just informational)",
+                    level=logging.WARNING
+                )
+            else:
+                logger.info("✓ No blocking CAPTCHA detected")
+            
+            # Check for CAPTCHA-related text (even if not blocking)
+            if _CAPTCHA_HINT_RE.search(content):
+                logger.info("  ℹ️  CAPTCHA-related text found (may be informational)")
+            
+            # Save a sample of the response for inspection
+            _IO_POOL.submit(_save, "test_response_sample.html", content[:10000])  # First 10000 bytes, as served
+            logger.info("  Saving sample response to test_response_sample.html")
+            
+            # Parse once, then answer every structural question from the tree
+            tree = lxml.html.document_fromstring(content)
+            form = tree.find('.//form')
+            field_names = [name.lower() for name in tree.xpath('//form//*[@name]/@name')]
+            form_action = form.get('action') if form is not None else None
             
-            # Check for common form indicators
             form_indicators = {
-                'form tags': '<form' in html,
-                'input tags': '<input' in html,
-                'select tags': '<select' in html,
-                'search endpoint': '/search' in html or 'search' in html,
-                'post method': 'method="post"' in html or "method='post'" in html,
+                'form tags': form is not None,
+                'input tags': tree.find('.//input') is not None,
+                'select tags': tree.find('.//select') is not None,
+                'search endpoint': 'search' in (form_action or '').lower()
+                                   or any('search' in name for name in field_names),
+                'post method': form is not None and form.get('method', '').lower() == 'post',
             }
             
-            logger.info("Form structure indicators found:")
+            # Check for common form indicators
+            lines = ["Form structure indicators found:"]
             for indicator, found in form_indicators.items():
                 status = "✓" if found else "✗"
-                logger.info(f"  {status} {indicator}")
+                lines.append(f"  {status} {indicator}")
             
             # Try to find form action
-            if '<form' in html:
-                import re
-                form_match = re.search(r'<form[^>]*action=["\']([^"\']+)["\']', response.text, re.IGNORECASE)
-                if form_match:
-                    logger.info(f"  Form action found: {form_match.group(1)}")
+            if form_action:
+                lines.append(f"  Form action found: {form_action}")
+            lines.append(f"  Named form fields: {len(field_names)}")
+            _log_block(*lines)
             
             return True
         else:
@@ -176,8 +226,10 @@ def test_search_form_inspection():
 
 def main():
     """Run all tests"""
-    logger.info("Starting test suite for reyestr.court.gov.ua")
-    logger.info("This will make a few test requests to understand the website behavior\n")
+    _log_block(
+        "Starting test suite for reyestr.court.gov.ua",
+        "This will make a few test requests to understand the website behavior\n"
+    )
     
     results = {
         'connection': False,
@@ -185,36 +237,51 @@ def main():
         'form_inspection': False
     }
     
-    # Test 1: Basic connection
-    results['connection'] = test_basic_connection()
-    
-    if not results['connection']:
-        logger.error("\n✗ Basic connection failed. Stopping tests.")
-        return results
+    # One keep-alive session for all tests; each test wraps it in its own handler
+    session = create_session()
     
-    # Test 2: Multiple pages
-    results['multiple_pages'] = test_multiple_pages()
-    
-    # Test 3: Form inspection
-    results['form_inspection'] = test_search_form_inspection()
+    try:
+        # Test 1: Basic connection
+        results['connection'] = test_basic_connection(session)
+        
+        if not results['connection']:
+            logger.error("\n✗ Basic connection failed. Stopping tests.")
+            return results
+        
+        # Tests 2 and 3 are independent once the site is reachable: run them
+        # side by side; they share one homepage load and the session's limits
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            multiple_pages = executor.submit(test_multiple_pages, session)
+            form_inspection = executor.submit(test_search_form_inspection, session)
+            results['multiple_pages'] = multiple_pages.result()
+            results['form_inspection'] = form_inspection.result()
+    finally:
+        session.close()
     
     # Final summary
-    logger.info("\n" + "=" * 60)
-    logger.info("FINAL SUMMARY")
-    logger.info("=" * 60)
-    logger.info(f"Basic connection: {'✓ PASS' if results['connection'] else '✗ FAIL'}")
-    logger.info(f"Multiple pages: {'✓ PASS' if results['multiple_pages'] else '✗ FAIL'}")
-    logger.info(f"Form inspection: {'✓ PASS' if results['form_inspection'] else '✗ FAIL'}")
-    
-    logger.info("\nNext steps:")
-    logger.info("1. Check test_response_sample.html to see the actual HTML structure")
-    logger.info("2. Inspect the form fields to understand search parameters")
-    logger.info("3. Adjust search parameters in advanced_example.py based on findings")
+    _log_block(
+        "\n" + "=" * 60,
+        "FINAL SUMMARY",
+        "=" * 60,
+        f"Basic connection: {'✓ PASS' if results['connection'] else '✗ FAIL'}",
+        f"Multiple pages: {'✓ PASS' if results['multiple_pages'] else '✗ FAIL'}",
+        f"Form inspection: {'✓ PASS' if results['form_inspection'] else '✗ FAIL'}",
+        "\nNext steps:",
+        "1. Check test_response_sample.html to see the actual HTML structure",
+        "2. Inspect the form fields to understand search parameters",
+        "3. Adjust search parameters in advanced_example.py based on findings"
+    )
     
     return results
 
 
 if __name__ == "__main__":
+    # Set up logging to see what's happening (only when run as a script)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    
     try:
         results = main()
         sys.exit(0 if results['connection'] else 1)
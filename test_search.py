@@ -3,31 +3,69 @@ Test script to try a simple search on reyestr.court.gov.ua
 This will help understand how search requests work.
 """
 
+import atexit
+import re
 import sys
-from bulk_requests import BulkRequestHandler, RequestConfig
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from bulk_requests import BulkRequestHandler, RequestConfig, create_session
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
-def test_simple_search():
+def _case_forms(*words: str) -> bytes:
+    """UTF-8 alternation of each word in lower, Capitalized and UPPER case"""
+    return b'|'.join(
+        form.encode('utf-8')
+        for word in words
+        for form in (word, word.capitalize(), word.upper())
+    )
+
+
+# Result/error hints, found in one alternation pass over the raw response
+# bytes instead of separate scans of a lowercased copy of the decoded page.
+# re.IGNORECASE on bytes folds ASCII only, so the Cyrillic words are listed
+# in their lower, Capitalized and UPPER forms; "error" matches in any case.
+_RESPONSE_PROBE_RE = re.compile(
+    b'(?P<results>' + _case_forms('результат', 'знайдено') + b')'
+    b'|(?P<error>' + _case_forms('помилка') + b'|(?i:error))'
+)
+
+# Sample files are written on a background thread so the next request is not
+# held up by disk I/O; the pool is drained at exit
+_IO_POOL = ThreadPoolExecutor(max_workers=1)
+atexit.register(_IO_POOL.shutdown)
+
+
+def _save(path: str, data: bytes):
+    """Write data to path (runs on _IO_POOL)"""
+    try:
+        with open(path, "wb") as f:
+            f.write(data)
+    except Exception as e:
+        logger.error(f"Failed to save {path}: {e}")
+
+
+def _log_block(*lines: str, level: int = logging.INFO):
+    """Log related lines as one record, so they are written in one go and stay together"""
+    logger.log(level, "\n".join(lines))
+
+
+def test_simple_search(session: Optional[requests.Session] = None):
     """Test a simple search request"""
-    logger.info("=" * 60)
-    logger.info("Testing Simple Search")
-    logger.info("=" * 60)
+    _log_block("=" * 60, "Testing Simple Search", "=" * 60)
     
     handler = BulkRequestHandler(
-        config=RequestConfig(delay_between_requests=3.0)
+        config=RequestConfig(delay_between_requests=3.0),
+        session=session
     )
     
     try:
         # First, get the homepage to establish session
         logger.info("Step 1: Loading homepage to establish session...")
-        home_response = handler.get_page("/")
+        home_response = handler.ensure_home()
         
         if not home_response or home_response.status_code != 200:
             logger.error("Failed to load homepage")
@@ -48,23 +86,28 @@ def test_simple_search():
         response = handler.post_search(search_params, endpoint="/")
         
         if response:
-            logger.info(f"✓ Search request completed")
-            logger.info(f"  Status code: {response.status_code}")
-            logger.info(f"  URL: {response.url}")
-            logger.info(f"  Content length: {len(response.text)} bytes")
+            _log_block(
+                "✓ Search request completed",
+                f"  Status code: {response.status_code}",
+                f"  URL: {response.url}",
+                f"  Content length: {len(response.content)} bytes"
+            )
             
             # Check if we got results or an error
             if response.status_code == 200:
                 # Save response to inspect
-                with open("test_search_response.html", "w", encoding="utf-8") as f:
-                    f.write(response.text)
-                logger.info("  Saved response to test_search_response.html")
+                _IO_POOL.submit(_save, "test_search_response.html", response.content)
+                logger.info("  Saving response to test_search_response.html")
                 
                 # Check for common indicators
-                content_lower = response.text.lower()
-                if 'результат' in content_lower or 'знайдено' in content_lower:
+                probes = set()
+                for match in _RESPONSE_PROBE_RE.finditer(response.content):
+                    probes.add(match.lastgroup)
+                    if len(probes) == 2:
+                        break
+                if 'results' in probes:
                     logger.info("  ℹ️  Response appears to contain results")
-                if 'помилка' in content_lower or 'error' in content_lower:
+                if 'error' in probes:
                     logger.warning("  ⚠️  Response may contain an error message")
                 if handler._has_captcha(response):
                     logger.warning("  ⚠️  CAPTCHA challenge detected")
@@ -81,19 +124,18 @@ def test_simple_search():
         handler.close()
 
 
-def test_search_with_params():
+def test_search_with_params(session: Optional[requests.Session] = None):
     """Test search with specific parameters"""
-    logger.info("\n" + "=" * 60)
-    logger.info("Testing Search with Parameters")
-    logger.info("=" * 60)
+    _log_block("\n" + "=" * 60, "Testing Search with Parameters", "=" * 60)
     
     handler = BulkRequestHandler(
-        config=RequestConfig(delay_between_requests=3.0)
+        config=RequestConfig(delay_between_requests=3.0),
+        session=session
     )
     
     try:
-        # Load homepage first
-        handler.get_page("/")
+        # Load homepage first (reused if the session has just loaded it)
+        handler.ensure_home()
         
         # Try search with a specific region
         logger.info("Attempting search with Київська область, Перша instance...")
@@ -107,14 +149,15 @@ def test_search_with_params():
         response = handler.post_search(search_params, endpoint="/")
         
         if response:
-            logger.info(f"✓ Search completed")
-            logger.info(f"  Status: {response.status_code}")
-            logger.info(f"  Length: {len(response.text)} bytes")
+            _log_block(
+                "✓ Search completed",
+                f"  Status: {response.status_code}",
+                f"  Length: {len(response.content)} bytes"
+            )
             
             if response.status_code == 200:
-                with open("test_search_with_params.html", "w", encoding="utf-8") as f:
-                    f.write(response.text)
-                logger.info("  Saved response to test_search_with_params.html")
+                _IO_POOL.submit(_save, "test_search_with_params.html", response.content)
+                logger.info("  Saving response to test_search_with_params.html")
             
             return True
         else:
@@ -129,27 +172,35 @@ def test_search_with_params():
 
 
 if __name__ == "__main__":
-    logger.info("Starting search tests\n")
+    # Configure logging only when run as a script, not on import
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
     
-    # Test 1: Simple empty search
-    result1 = test_simple_search()
+    logger.info("Starting search tests\n")
     
-    # Wait a bit before next test
-    import time
-    logger.info("\nWaiting 5 seconds before next test...")
-    time.sleep(5)
+    # One keep-alive session for both tests; each test wraps it in its own handler
+    session = create_session()
     
-    # Test 2: Search with parameters
-    result2 = test_search_with_params()
+    try:
+        # Test 1: Simple empty search
+        result1 = test_simple_search(session)
+        
+        # Test 2 (the session's rate limiter spaces it from test 1): Search with parameters
+        result2 = test_search_with_params(session)
+    finally:
+        session.close()
     
     # Summary
-    logger.info("\n" + "=" * 60)
-    logger.info("Test Summary")
-    logger.info("=" * 60)
-    logger.info(f"Simple search: {'✓ PASS' if result1 else '✗ FAIL'}")
-    logger.info(f"Parameterized search: {'✓ PASS' if result2 else '✗ FAIL'}")
-    
-    logger.info("\nNext steps:")
-    logger.info("1. Check test_search_response.html and test_search_with_params.html")
-    logger.info("2. Inspect the HTML to see if searches are working")
-    logger.info("3. Adjust search parameters based on findings")
+    _log_block(
+        "\n" + "=" * 60,
+        "Test Summary",
+        "=" * 60,
+        f"Simple search: {'✓ PASS' if result1 else '✗ FAIL'}",
+        f"Parameterized search: {'✓ PASS' if result2 else '✗ FAIL'}",
+        "\nNext steps:",
+        "1. Check test_search_response.html and test_search_with_params.html",
+        "2. Inspect the HTML to see if searches are working",
+        "3. Adjust search parameters based on findings"
+    )
@@ -2,12 +2,18 @@
 Update document metadata in database from downloaded HTML files
 """
 
+import csv
+import io
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from bs4 import BeautifulSoup
+import lxml.html
 import psycopg2
-from datetime import datetime
-from typing import Dict, Optional
+from datetime import date
+from typing import Dict, List, Optional, Set
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeElapsedColumn
 from rich.table import Table
@@ -34,19 +40,115 @@ DB_CONFIG = {
 }
 
 
-def parse_date(date_str: str) -> Optional[datetime.date]:
-    """Parse date string in DD.MM.YYYY format"""
-    if not date_str or date_str.strip() == '':
+# Label patterns per metadata field, in priority order: field ->
+# (patterns, also search the raw HTML on a miss in the text, minimum value length)
+FIELD_LABEL_PATTERNS = {
+    'court_name': ([
+        r'Суд[:\s]+([^\n]+)',
+        r'Назва\s+суду[:\s]+([^\n]+)',
+        r'Судовий\s+орган[:\s]+([^\n]+)',
+        r'<td[^>]*>Суд[:\s]*</td>\s*<td[^>]*>([^<]+)</td>',
+        r'<label[^>]*>Суд[:\s]*</label>\s*<[^>]*>([^<]+)</',
+    ], True, 4),
+    'judge_name': ([
+        r'Суддя[:\s]+([^\n]+)',
+        r'ПІБ\s+судді[:\s]+([^\n]+)',
+        r'Судд[яі][:\s]+([^\n]+)',
+        r'<td[^>]*>Суддя[:\s]*</td>\s*<td[^>]*>([^<]+)</td>',
+        r'<label[^>]*>Суддя[:\s]*</label>\s*<[^>]*>([^<]+)</',
+    ], True, 4),
+    'decision_type': ([
+        r'Вид\s+рішення[:\s]+([^\n]+)',
+        r'Тип\s+рішення[:\s]+([^\n]+)',
+        r'Рішення[:\s]+([^\n]+)',
+        r'<td[^>]*>Вид\s+рішення[:\s]*</td>\s*<td[^>]*>([^<]+)</td>',
+    ], True, 1),
+    'decision_date': ([
+        r'Дата\s+рішення[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
+        r'Дата\s+прийняття[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
+        r'Дата[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
+    ], False, 1),
+    'law_date': ([
+        r'Дата\s+набуття\s+чинності[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
+        r'Набуття\s+чинності[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
+    ], False, 1),
+    'case_type': ([
+        r'Вид\s+справи[:\s]+([^\n]+)',
+        r'Категорія\s+справи[:\s]+([^\n]+)',
+        r'Тип\s+справи[:\s]+([^\n]+)',
+    ], True, 1),
+    'case_number': ([
+        r'Номер\s+справи[:\s]+([^\n]+)',
+        r'Справа\s+№[:\s]*([^\n]+)',
+        r'№\s+справи[:\s]+([^\n]+)',
+    ], True, 1),
+    'reg_number': ([
+        r'Реєстраційний\s+номер[:\s]+([^\n]+)',
+        r'Реєстр[:\s]+№[:\s]*([^\n]+)',
+    ], False, 1),
+}
+
+DATE_FIELDS = ('decision_date', 'law_date')
+
+# Table rows: label words -> field, in priority order (a filled field
+# passes the row on to the next rule)
+TABLE_LABEL_FIELDS = (
+    (('суд',), 'court_name'),
+    (('судд',), 'judge_name'),
+    (('вид', 'рішення'), 'decision_type'),
+    (('дата', 'рішення'), 'decision_date'),
+    (('набуття', 'чинності'), 'law_date'),
+    (('вид', 'справи'), 'case_type'),
+    (('номер', 'справи'), 'case_number'),
+    (('реєстраційний', 'номер'), 'reg_number'),
+)
+
+# Every label pattern and table rule above needs one of these words; a file
+# containing none of them (error page, redirect stub) has nothing to extract
+LABEL_ANCHORS = tuple(
+    form.encode('utf-8')
+    for stem in ('суд', 'рішення', 'дата', 'набуття', 'справ', 'реєстр')
+    for form in (stem, stem.capitalize(), stem.upper())
+)
+
+# Downloaded pages are saved as UTF-8; without this libxml2 guesses from <meta>
+UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+# Bytes read before deciding whether the rest of a file is needed; the rest
+# is skipped only if the head yields every field
+HEAD_READ_SIZE = 64 * 1024
+
+# Day-first date with one consistent separator, or ISO YYYY-MM-DD
+DATE_RE = re.compile(r'(\d{1,2})([./-])(\d{1,2})\2(\d{4})|(\d{4})-(\d{1,2})-(\d{1,2})')
+
+
+def _compile_label_patterns(flags) -> Dict[str, List[re.Pattern]]:
+    """Compile every field's label patterns once, keeping priority order"""
+    return {
+        field: [re.compile(pattern, flags) for pattern in patterns]
+        for field, (patterns, _, _) in FIELD_LABEL_PATTERNS.items()
+    }
+
+
+# Each pattern is searched on its own: one fused alternation would consume
+# text, hiding a label that sits inside another label's match
+TEXT_LABEL_RES = _compile_label_patterns(re.IGNORECASE | re.MULTILINE)
+HTML_LABEL_RES = _compile_label_patterns(re.IGNORECASE | re.DOTALL)
+
+
+def parse_date(date_str: str) -> Optional[date]:
+    """Parse date string in DD.MM.YYYY format (also DD/MM/YYYY, DD-MM-YYYY, YYYY-MM-DD)"""
+    if not date_str:
+        return None
+    match = DATE_RE.fullmatch(date_str.strip())
+    if not match:
         return None
+    day, _, month, year, iso_year, iso_month, iso_day = match.groups()
     try:
-        return datetime.strptime(date_str.strip(), '%d.%m.%Y').date()
+        if year:
+            return date(int(year), int(month), int(day))
+        return date(int(iso_year), int(iso_month), int(iso_day))
     except ValueError:
-        # Try other formats
-        for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']:
-            try:
-                return datetime.strptime(date_str.strip(), fmt).date()
-            except ValueError:
-                continue
         return None
 
 
@@ -57,6 +159,38 @@ def extract_metadata_from_html(html_path: Path) -> Dict[str, Optional[str]]:
     Returns:
         Dictionary with extracted metadata fields
     """
+    try:
+        with open(html_path, 'rb') as f:
+            html_bytes = f.read(HEAD_READ_SIZE + 1)
+            if len(html_bytes) <= HEAD_READ_SIZE:
+                return _extract_metadata(html_bytes, html_path)
+            
+            # Labels sit in the header near the top, so try the head alone first;
+            # cutting at the last tag start never splits a tag or UTF-8 character
+            cut = html_bytes.rfind(b'<', 0, HEAD_READ_SIZE)
+            metadata = _extract_metadata(html_bytes[:cut if cut > 0 else HEAD_READ_SIZE], html_path)
+            if all(metadata.values()):
+                return metadata
+            
+            # Some field is missing from the head: look for just those in the whole file
+            return _extract_metadata(html_bytes + f.read(), html_path, metadata)
+        
+    except OSError as e:
+        logger.warning(f"Error reading {html_path}: {e}")
+        return dict.fromkeys(METADATA_COLUMNS)
+
+
+def _extract_metadata(
+    html_bytes: bytes,
+    html_path: Path,
+    found: Optional[Dict[str, Optional[str]]] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Extract metadata from the raw bytes of an HTML file
+    
+    Fields already set in found (e.g. from the head of the file) are kept
+    and only the missing ones are searched for.
+    """
     metadata = {
         'court_name': None,
         'judge_name': None,
@@ -67,275 +201,292 @@ def extract_metadata_from_html(html_path: Path) -> Dict[str, Optional[str]]:
         'case_number': None,
         'reg_number': None
     }
+    if found:
+        metadata.update(found)
     
     try:
-        with open(html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Get all text content for pattern matching
-        text = soup.get_text()
-        
-        # Extract court name - look for patterns like "Суд:", "Назва суду:", etc.
-        court_patterns = [
-            r'Суд[:\s]+([^\n]+)',
-            r'Назва\s+суду[:\s]+([^\n]+)',
-            r'Судовий\s+орган[:\s]+([^\n]+)',
-            r'<td[^>]*>Суд[:\s]*</td>\s*<td[^>]*>([^<]+)</td>',
-            r'<label[^>]*>Суд[:\s]*</label>\s*<[^>]*>([^<]+)</',
-        ]
-        
-        for pattern in court_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if not match:
-                # Try in HTML
-                match = re.search(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            if match:
-                court_name = match.group(1).strip()
-                if court_name and len(court_name) > 3:
-                    metadata['court_name'] = court_name
-                    break
-        
-        # Extract judge name - look for "Суддя:", "ПІБ судді:", etc.
-        judge_patterns = [
-            r'Суддя[:\s]+([^\n]+)',
-            r'ПІБ\s+судді[:\s]+([^\n]+)',
-            r'Судд[яі][:\s]+([^\n]+)',
-            r'<td[^>]*>Суддя[:\s]*</td>\s*<td[^>]*>([^<]+)</td>',
-            r'<label[^>]*>Суддя[:\s]*</label>\s*<[^>]*>([^<]+)</',
-        ]
-        
-        for pattern in judge_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if not match:
-                match = re.search(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            if match:
-                judge_name = match.group(1).strip()
-                if judge_name and len(judge_name) > 3:
-                    metadata['judge_name'] = judge_name
-                    break
-        
-        # Extract decision type - look for "Вид рішення:", "Тип рішення:", etc.
-        decision_type_patterns = [
-            r'Вид\s+рішення[:\s]+([^\n]+)',
-            r'Тип\s+рішення[:\s]+([^\n]+)',
-            r'Рішення[:\s]+([^\n]+)',
-            r'<td[^>]*>Вид\s+рішення[:\s]*</td>\s*<td[^>]*>([^<]+)</td>',
-        ]
-        
-        for pattern in decision_type_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if not match:
-                match = re.search(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            if match:
-                decision_type = match.group(1).strip()
-                if decision_type:
-                    metadata['decision_type'] = decision_type
-                    break
-        
-        # Extract decision date - look for "Дата рішення:", "Дата:", etc.
-        date_patterns = [
-            r'Дата\s+рішення[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
-            r'Дата\s+прийняття[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
-            r'Дата[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                date_str = match.group(1).strip()
-                # Normalize date format
-                date_str = date_str.replace('/', '.').replace('-', '.')
-                metadata['decision_date'] = date_str
-                break
-        
-        # Extract law date (date of legal force) - "Дата набуття чинності:"
-        law_date_patterns = [
-            r'Дата\s+набуття\s+чинності[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
-            r'Набуття\s+чинності[:\s]+(\d{1,2}[./-]\d{1,2}[./-]\d{2,4})',
-        ]
-        
-        for pattern in law_date_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                date_str = match.group(1).strip()
-                date_str = date_str.replace('/', '.').replace('-', '.')
-                metadata['law_date'] = date_str
-                break
+        # Substring checks on the raw bytes reject label-less files before parsing
+        if not any(anchor in html_bytes for anchor in LABEL_ANCHORS):
+            return metadata
         
-        # Extract case type - "Вид справи:", "Категорія справи:", etc.
-        case_type_patterns = [
-            r'Вид\s+справи[:\s]+([^\n]+)',
-            r'Категорія\s+справи[:\s]+([^\n]+)',
-            r'Тип\s+справи[:\s]+([^\n]+)',
-        ]
-        
-        for pattern in case_type_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if not match:
-                match = re.search(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            if match:
-                case_type = match.group(1).strip()
-                if case_type:
-                    metadata['case_type'] = case_type
-                    break
-        
-        # Extract case number - "Номер справи:", "Справа №", etc.
-        case_number_patterns = [
-            r'Номер\s+справи[:\s]+([^\n]+)',
-            r'Справа\s+№[:\s]*([^\n]+)',
-            r'№\s+справи[:\s]+([^\n]+)',
-        ]
-        
-        for pattern in case_number_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if not match:
-                match = re.search(pattern, html_content, re.IGNORECASE | re.DOTALL)
-            if match:
-                case_number = match.group(1).strip()
-                if case_number:
-                    metadata['case_number'] = case_number
-                    break
-        
-        # Extract registration number - usually in the filename or URL
-        # Try to extract from HTML content
-        reg_number_patterns = [
-            r'Реєстраційний\s+номер[:\s]+([^\n]+)',
-            r'Реєстр[:\s]+№[:\s]*([^\n]+)',
-        ]
-        
-        for pattern in reg_number_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                reg_number = match.group(1).strip()
-                if reg_number:
-                    metadata['reg_number'] = reg_number
+        # Hand the raw bytes to libxml2 and let it decode in C; the tree gives
+        # the text for pattern matching and serves the table fallback below
+        try:
+            tree = lxml.html.document_fromstring(html_bytes, parser=UTF8_HTML_PARSER)
+            text = tree.text_content()
+        except Exception:
+            tree = None
+            text = BeautifulSoup(html_bytes, 'html.parser', from_encoding='utf-8').get_text()
+        
+        # Patterns are tried in priority order; a pattern with no match in the
+        # text is tried against the HTML (decoded on first use) before moving
+        # on to the next one
+        html_content = None
+        for field, (_, search_html, min_len) in FIELD_LABEL_PATTERNS.items():
+            if metadata[field]:
+                continue
+            for text_re, html_re in zip(TEXT_LABEL_RES[field], HTML_LABEL_RES[field]):
+                match = text_re.search(text)
+                if not match and search_html:
+                    if html_content is None:
+                        html_content = html_bytes.decode('utf-8', 'ignore')
+                    match = html_re.search(html_content)
+                if match:
+                    value = match.group(1).strip()
+                    if len(value) >= min_len:
+                        if field in DATE_FIELDS:
+                            # Normalize date format
+                            value = value.replace('/', '.').replace('-', '.')
+                        metadata[field] = value
+                        break
+        
+        # Also try to extract from table structure (common in Ukrainian court sites),
+        # unless the labels already gave every field
+        if all(metadata.values()):
+            return metadata
+        
+        # Nothing left to scan if libxml2 could not parse the document
+        if tree is None:
+            return metadata
+        
+        # XPath returns only rows with a label and a value cell
+        for row in tree.xpath('//table//tr[count(td|th) >= 2]'):
+            label_cell, value_cell = row.xpath('./td|./th')[:2]
+            label = label_cell.text_content().strip().lower()
+            
+            # First rule whose words are all in the label and whose field is still empty
+            for keywords, field in TABLE_LABEL_FIELDS:
+                if not metadata[field] and all(keyword in label for keyword in keywords):
+                    value = value_cell.text_content().strip()
+                    if field in DATE_FIELDS:
+                        value = value.replace('/', '.').replace('-', '.')
+                    metadata[field] = value
                     break
-        
-        # Also try to extract from table structure (common in Ukrainian court sites)
-        tables = soup.find_all('table')
-        for table in tables:
-            rows = table.find_all('tr')
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                if len(cells) >= 2:
-                    label = cells[0].get_text(strip=True).lower()
-                    value = cells[1].get_text(strip=True)
-                    
-                    if 'суд' in label and not metadata['court_name']:
-                        metadata['court_name'] = value
-                    elif 'судд' in label and not metadata['judge_name']:
-                        metadata['judge_name'] = value
-                    elif 'вид' in label and 'рішення' in label and not metadata['decision_type']:
-                        metadata['decision_type'] = value
-                    elif 'дата' in label and 'рішення' in label and not metadata['decision_date']:
-                        date_str = value.replace('/', '.').replace('-', '.')
-                        metadata['decision_date'] = date_str
-                    elif 'набуття' in label and 'чинності' in label and not metadata['law_date']:
-                        date_str = value.replace('/', '.').replace('-', '.')
-                        metadata['law_date'] = date_str
-                    elif 'вид' in label and 'справи' in label and not metadata['case_type']:
-                        metadata['case_type'] = value
-                    elif 'номер' in label and 'справи' in label and not metadata['case_number']:
-                        metadata['case_number'] = value
-                    elif 'реєстраційний' in label and 'номер' in label and not metadata['reg_number']:
-                        metadata['reg_number'] = value
-        
+    
     except Exception as e:
         logger.warning(f"Error extracting metadata from {html_path}: {e}")
     
     return metadata
 
 
-def update_document_metadata_in_db(document_id: str, metadata: Dict) -> bool:
+# Metadata columns written to the documents table, in VALUES order
+METADATA_COLUMNS = (
+    'court_name', 'judge_name', 'decision_type', 'decision_date',
+    'law_date', 'case_type', 'case_number', 'reg_number'
+)
+
+# Documents staged per COPY and UPDATE (and commit)
+UPDATE_BATCH_SIZE = 500
+
+# HTML files handed to a parser process per task
+PARSE_CHUNKSIZE = 32
+
+# Documents per progress bar update
+PROGRESS_STEP = 32
+
+# Extracted metadata cache, kept in the processed directory
+METADATA_CACHE_FILE = '.meta_cache.json'
+
+# Bump whenever extraction can give different results for the same file,
+# so cached metadata from an older extractor is not reused
+EXTRACTOR_VERSION = 3
+
+# Staging table for one batch, loaded with COPY and dropped at commit
+METADATA_STAGING_SQL = """
+    CREATE TEMP TABLE metadata_updates (
+        id VARCHAR(50),
+        court_name TEXT,
+        judge_name TEXT,
+        decision_type TEXT,
+        decision_date DATE,
+        law_date DATE,
+        case_type TEXT,
+        case_number TEXT,
+        reg_number TEXT
+    ) ON COMMIT DROP
+"""
+METADATA_COPY_SQL = "COPY metadata_updates FROM STDIN WITH (FORMAT csv)"
+
+# NULL in a staged row keeps the column's current value
+METADATA_BATCH_UPDATE_SQL = """
+    UPDATE documents AS d
+    SET court_name = COALESCE(v.court_name, d.court_name),
+        judge_name = COALESCE(v.judge_name, d.judge_name),
+        decision_type = COALESCE(v.decision_type, d.decision_type),
+        decision_date = COALESCE(v.decision_date, d.decision_date),
+        law_date = COALESCE(v.law_date, d.law_date),
+        case_type = COALESCE(v.case_type, d.case_type),
+        case_number = COALESCE(v.case_number, d.case_number),
+        reg_number = COALESCE(v.reg_number, d.reg_number),
+        updated_at = CURRENT_TIMESTAMP
+    FROM metadata_updates AS v
+    WHERE d.id = v.id
+    RETURNING d.id
+"""
+
+# Documents that already have every metadata column set
+COMPLETE_DOCUMENTS_SQL = (
+    "SELECT id FROM documents WHERE "
+    + " AND ".join(f"{column} IS NOT NULL" for column in METADATA_COLUMNS)
+)
+
+
+def build_metadata_row(document_id: str, metadata: Dict) -> Optional[tuple]:
     """
-    Update document metadata in database
+    Build the staging row for one document (dates parsed, empty values as None)
     
     Returns:
-        True if updated successfully, False on error
+        Row tuple, or None if no field has a usable value
+    """
+    values = []
+    for column in METADATA_COLUMNS:
+        value = metadata.get(column) or None
+        if value and column in DATE_FIELDS:
+            value = parse_date(value)
+        values.append(value)
+    
+    if not any(values):
+        return None
+    return (document_id, *values)
+
+
+def _apply_metadata_rows(conn, rows: List[tuple]) -> Set[str]:
+    """
+    COPY rows into a temp table, apply them with one UPDATE ... FROM and commit
+    
+    Returns:
+        Set of document ids that were updated (raises on database error)
+    """
+    # CSV leaves None unquoted and empty, which COPY reads as NULL
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    
+    with conn.cursor() as cur:
+        cur.execute(METADATA_STAGING_SQL)
+        cur.copy_expert(METADATA_COPY_SQL, buffer)
+        cur.execute(METADATA_BATCH_UPDATE_SQL)
+        updated = cur.fetchall()
+    conn.commit()
+    return {row[0] for row in updated}
+
+
+def update_documents_metadata_batch(conn, rows: List[tuple]) -> Set[str]:
+    """
+    Update metadata for a batch of documents in one transaction
+    
+    If the batch fails (e.g. a value too long for its column or a duplicate
+    reg_number), its rows are retried one at a time so only the offending
+    documents are lost.
+    
+    Returns:
+        Set of document ids that were updated
     """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Build update query - only update non-None values
-        updates = []
-        values = []
-        
-        if metadata.get('court_name'):
-            updates.append('court_name = %s')
-            values.append(metadata['court_name'])
-        
-        if metadata.get('judge_name'):
-            updates.append('judge_name = %s')
-            values.append(metadata['judge_name'])
-        
-        if metadata.get('decision_type'):
-            updates.append('decision_type = %s')
-            values.append(metadata['decision_type'])
-        
-        if metadata.get('decision_date'):
-            decision_date = parse_date(metadata['decision_date'])
-            if decision_date:
-                updates.append('decision_date = %s')
-                values.append(decision_date)
-        
-        if metadata.get('law_date'):
-            law_date = parse_date(metadata['law_date'])
-            if law_date:
-                updates.append('law_date = %s')
-                values.append(law_date)
-        
-        if metadata.get('case_type'):
-            updates.append('case_type = %s')
-            values.append(metadata['case_type'])
-        
-        if metadata.get('case_number'):
-            updates.append('case_number = %s')
-            values.append(metadata['case_number'])
-        
-        if metadata.get('reg_number'):
-            updates.append('reg_number = %s')
-            values.append(metadata['reg_number'])
-        
-        if not updates:
-            cur.close()
-            conn.close()
-            return False
-        
-        # Add document_id and updated_at
-        values.append(document_id)
-        updates.append('updated_at = CURRENT_TIMESTAMP')
-        
-        query = f"""
-            UPDATE documents 
-            SET {', '.join(updates)}
-            WHERE id = %s
-        """
-        
-        cur.execute(query, values)
-        
-        if cur.rowcount > 0:
-            conn.commit()
-            cur.close()
-            conn.close()
-            return True
-        else:
-            conn.rollback()
-            cur.close()
-            conn.close()
-            return False
-        
+        return _apply_metadata_rows(conn, rows)
     except Exception as e:
-        logger.warning(f"Database error updating {document_id}: {e}")
+        logger.warning(f"Database error updating batch of {len(rows)} documents, retrying one by one: {e}")
+        _rollback(conn)
+    
+    updated_ids = set()
+    for row in rows:
         try:
-            conn.rollback()
-            cur.close()
-            conn.close()
-        except:
-            pass
-        return False
+            updated_ids |= _apply_metadata_rows(conn, [row])
+        except Exception as e:
+            logger.warning(f"Database error updating document {row[0]}: {e}")
+            _rollback(conn)
+    return updated_ids
+
+
+def _rollback(conn):
+    """Roll back the current transaction, ignoring a broken connection"""
+    try:
+        conn.rollback()
+    except Exception:
+        pass
+
+
+def fetch_complete_document_ids(conn) -> Set[str]:
+    """
+    Get ids of documents whose metadata columns are all filled
+    
+    Returns:
+        Set of document ids (empty on database error)
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(COMPLETE_DOCUMENTS_SQL)
+            complete_ids = {row[0] for row in cur.fetchall()}
+        conn.commit()
+        return complete_ids
+        
+    except Exception as e:
+        logger.warning(f"Could not load documents with complete metadata: {e}")
+        _rollback(conn)
+        return set()
+
+
+def metadata_cache_key(html_path: Path) -> str:
+    """Cache key that changes whenever the file is rewritten"""
+    stat = html_path.stat()
+    return f"{html_path}|{stat.st_mtime_ns}|{stat.st_size}"
+
+
+def load_metadata_cache(cache_path: Path) -> Dict:
+    """
+    Load extracted metadata cached by a previous run
+    
+    Returns:
+        Dictionary keyed by metadata_cache_key(), empty if there is no usable
+        cache or it was written by a different EXTRACTOR_VERSION
+    """
+    if not cache_path.exists():
+        return {}
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable metadata cache {cache_path}: {e}")
+        return {}
+    
+    if not isinstance(cache, dict) or cache.get('extractor_version') != EXTRACTOR_VERSION:
+        return {}
+    
+    entries = cache.get('entries')
+    if not isinstance(entries, dict):
+        return {}
+    return {key: metadata for key, metadata in entries.items() if isinstance(metadata, dict)}
+
+
+def save_metadata_cache(cache_path: Path, cache: Dict):
+    """Write the metadata cache for the next run"""
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'extractor_version': EXTRACTOR_VERSION, 'entries': cache}, f, ensure_ascii=False)
+    except Exception as e:
+        logger.warning(f"Could not save metadata cache {cache_path}: {e}")
+
+
+def _flush_metadata_updates(conn, pending: List[tuple], stats: Dict):
+    """Write the pending (document_id, metadata, row) batch and count the outcome"""
+    if not pending:
+        return
+    
+    updated_ids = update_documents_metadata_batch(conn, [row for _, _, row in pending])
+    for document_id, metadata, _ in pending:
+        if document_id in updated_ids:
+            stats['updated'] += 1
+            stats['processed'] += 1
+            
+            # Count which fields were updated
+            for field in stats['fields_updated']:
+                if metadata.get(field):
+                    stats['fields_updated'][field] += 1
+        else:
+            stats['errors'] += 1
+    
+    pending.clear()
 
 
 def process_downloaded_documents(directory: Path) -> Dict:
@@ -349,6 +500,7 @@ def process_downloaded_documents(directory: Path) -> Dict:
         'total_dirs': 0,
         'processed': 0,
         'updated': 0,
+        'skipped': 0,
         'errors': 0,
         'fields_updated': {
             'court_name': 0,
@@ -365,8 +517,9 @@ def process_downloaded_documents(directory: Path) -> Dict:
         console.print(f"[bold red]Directory not found: {directory}[/bold red]")
         return stats
     
-    # Find all document directories
-    doc_dirs = [d for d in directory.iterdir() if d.is_dir()]
+    # Find all document directories (scandir entries cache the file type)
+    with os.scandir(directory) as entries:
+        doc_dirs = [Path(entry.path) for entry in entries if entry.is_dir()]
     stats['total_dirs'] = len(doc_dirs)
     
     if not doc_dirs:
@@ -375,6 +528,32 @@ def process_downloaded_documents(directory: Path) -> Dict:
     
     console.print(f"\n[bold cyan]Found {len(doc_dirs)} document directories[/bold cyan]")
     
+    # One connection for the whole run; updates are sent in batches
+    conn = psycopg2.connect(**DB_CONFIG)
+    pending = []
+    
+    # Documents with every metadata column filled have nothing left to update
+    complete_ids = fetch_complete_document_ids(conn)
+    if complete_ids:
+        doc_dirs = [d for d in doc_dirs if d.name not in complete_ids]
+        stats['skipped'] = stats['total_dirs'] - len(doc_dirs)
+    
+    # Metadata of files unchanged since the last run is reused from the cache
+    cache_path = directory / METADATA_CACHE_FILE
+    cache = load_metadata_cache(cache_path)
+    
+    try:
+        _process_doc_dirs(doc_dirs, conn, pending, stats, cache)
+    finally:
+        _flush_metadata_updates(conn, pending, stats)
+        conn.close()
+        save_metadata_cache(cache_path, cache)
+    
+    return stats
+
+
+def _process_doc_dirs(doc_dirs: List[Path], conn, pending: List[tuple], stats: Dict, cache: Dict):
+    """Extract metadata from each document directory, queueing batched DB updates"""
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -391,51 +570,60 @@ def process_downloaded_documents(directory: Path) -> Dict:
             total=len(doc_dirs)
         )
         
+        # Locate the HTML file of each document (prefer print version, then regular)
+        documents = []
         for doc_dir in doc_dirs:
-            try:
-                # Try to find HTML files (prefer print version, then regular)
-                html_files = list(doc_dir.glob("*_print.html"))
-                if not html_files:
-                    html_files = list(doc_dir.glob("*.html"))
-                
-                if not html_files:
-                    progress.advance(task_id)
-                    continue
-                
-                # Use first HTML file found
-                html_file = html_files[0]
+            html_files = list(doc_dir.glob("*_print.html"))
+            if not html_files:
+                html_files = list(doc_dir.glob("*.html"))
+            
+            if html_files:
+                # Document ID is the directory name; use first HTML file found
+                documents.append((doc_dir.name, html_files[0]))
+        
+        # Directories without HTML count as done straight away
+        progress.advance(task_id, len(doc_dirs) - len(documents))
+        
+        # Only files not in the cache (new or modified) need parsing
+        keys = [metadata_cache_key(html_file) for _, html_file in documents]
+        misses = [html_file for (_, html_file), key in zip(documents, keys) if key not in cache]
+        
+        # Parsing is CPU-bound, so extract in worker processes; DB writes stay here
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            parsed = executor.map(
+                extract_metadata_from_html,
+                misses,
+                chunksize=PARSE_CHUNKSIZE
+            )
+            for done, ((document_id, html_file), key) in enumerate(zip(documents, keys), 1):
+                metadata = cache.get(key)
+                if metadata is None:
+                    metadata = cache[key] = next(parsed)
                 
-                # Extract document ID from directory name
-                document_id = doc_dir.name
-                
-                # Extract metadata
-                metadata = extract_metadata_from_html(html_file)
-                
-                # Count extracted fields
-                extracted_fields = sum(1 for v in metadata.values() if v)
-                if extracted_fields > 0:
-                    # Update database
-                    if update_document_metadata_in_db(document_id, metadata):
-                        stats['updated'] += 1
-                        stats['processed'] += 1
-                        
-                        # Count which fields were updated
-                        for field in stats['fields_updated']:
-                            if metadata.get(field):
-                                stats['fields_updated'][field] += 1
+                try:
+                    # Count extracted fields
+                    extracted_fields = sum(1 for v in metadata.values() if v)
+                    if extracted_fields > 0:
+                        # Queue the database update
+                        row = build_metadata_row(document_id, metadata)
+                        if row is None:
+                            stats['errors'] += 1
+                        else:
+                            pending.append((document_id, metadata, row))
+                            if len(pending) >= UPDATE_BATCH_SIZE:
+                                _flush_metadata_updates(conn, pending, stats)
                     else:
-                        stats['errors'] += 1
-                else:
-                    stats['processed'] += 1
-                
-                progress.advance(task_id)
+                        stats['processed'] += 1
+                    
+                except Exception as e:
+                    logger.warning(f"Error processing {html_file.parent}: {e}")
+                    stats['errors'] += 1
                 
-            except Exception as e:
-                logger.warning(f"Error processing {doc_dir}: {e}")
-                stats['errors'] += 1
-                progress.advance(task_id)
-    
-    return stats
+                # Redraw in steps rather than per document
+                if done % PROGRESS_STEP == 0:
+                    progress.advance(task_id, PROGRESS_STEP)
+        
+        progress.advance(task_id, len(documents) % PROGRESS_STEP)
 
 
 def main():
@@ -476,6 +664,7 @@ def main():
     summary_table.add_row("Total Directories", str(stats['total_dirs']))
     summary_table.add_row("Processed", f"[green]{stats['processed']}[/green]")
     summary_table.add_row("Updated in DB", f"[green]{stats['updated']}[/green]")
+    summary_table.add_row("Already Complete", str(stats['skipped']))
     summary_table.add_row("Errors", f"[red]{stats['errors']}[/red]" if stats['errors'] > 0 else "0")
     
     console.print(summary_table)